@@ -1,9 +1,10 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 from app.api.v1.profile import profile_router
 from app.api.v1.auth import auth_router
 from app.api.v1.public import public_router
+from app.security.rate_limit import rate_limit
 
-router = APIRouter(prefix="/v1")
+router = APIRouter(prefix="/v1", dependencies=[Depends(rate_limit)])
 
 router.include_router(auth_router)
 router.include_router(profile_router)
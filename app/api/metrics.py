@@ -0,0 +1,77 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.db.redis import redis_pool
+from app.db.near_cache import near_cache
+from app.security.crypt_context import password_hasher
+from app.utils.single_flight import single_flight
+from app.utils.metrics import Collected, registry
+
+router = APIRouter()
+
+# password_hasher stats that only go up, exported as counters
+PASSWORD_HASHER_COUNTERS = {"calls": "calls", "rejected": "rejected", "wait_seconds_total": "wait_seconds"}
+
+# stats the pools and caches keep themselves, read when scraped
+registry.register(Collected(
+    "near_cache_requests_total",
+    "Cached response lookups in this worker's near cache, by key family",
+    ("family", "result"),
+    lambda: {
+        (family, result): counters[counter]
+        for family, counters in near_cache.metrics()["families"].items()
+        for result, counter in (("hit", "hits"), ("miss", "misses"))
+    },
+    kind="counter"
+))
+registry.register(Collected(
+    "near_cache_evictions_total",
+    "Near cache entries pushed out by size, by key family",
+    ("family",),
+    lambda: {
+        (family,): counters["evictions"]
+        for family, counters in near_cache.metrics()["families"].items()
+    },
+    kind="counter"
+))
+registry.register(Collected(
+    "near_cache_entries",
+    "Keys held in this worker's near cache",
+    (),
+    lambda: {(): near_cache.metrics()["size"]}
+))
+registry.register(Collected(
+    "redis_pool_connections",
+    "Redis connections in this worker's pool, by state",
+    ("state",),
+    lambda: {(name.removesuffix("_connections"),): value for name, value in redis_pool.metrics().items()}
+))
+registry.register(Collected(
+    "password_hasher",
+    "Password hashing pool sizes and longest wait (workers, queue_limit, pending, wait_seconds_max)",
+    ("stat",),
+    lambda: {
+        (name,): value for name, value in password_hasher.metrics().items()
+        if name not in PASSWORD_HASHER_COUNTERS
+    }
+))
+registry.register(Collected(
+    "password_hasher_total",
+    "Password hashing calls, rejections and time spent waiting for a worker",
+    ("stat",),
+    lambda: {
+        (PASSWORD_HASHER_COUNTERS[name],): value for name, value in password_hasher.metrics().items()
+        if name in PASSWORD_HASHER_COUNTERS
+    },
+    kind="counter"
+))
+registry.register(Collected(
+    "single_flight_in_flight",
+    "Cache fills currently shared between requests",
+    (),
+    lambda: {(): len(single_flight)}
+))
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
@@ -18,7 +18,7 @@ async def login(
     if not user_exists:
         raise BadRequestProblem(detail="Wrong username or password")
     
-    verify_password = user_exists.verify_password(user_form.password)
+    verify_password = await user_exists.verify_password(user_form.password)
     if not verify_password:
         raise BadRequestProblem(detail="Wrong username or password")
     
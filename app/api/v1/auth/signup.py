@@ -1,5 +1,7 @@
 from fastapi import APIRouter, status
+from pymongo.errors import DuplicateKeyError
 from app.schemas import User, SignUpForm
+from app.utils.resolver import username_resolver
 from fastapi_problem.error import BadRequestProblem
 
 router = APIRouter()
@@ -18,7 +20,13 @@ async def create_user(
     
     new_user = User(
         username = user_form.username,
-        password = SignUpForm.hash_password(user_form.password)
+        password = await SignUpForm.hash_password(user_form.password)
     )
-    await User.insert(new_user)
+    try:
+        await User.insert(new_user)
+    except DuplicateKeyError:
+        # taken since the check above, username_unique caught it
+        raise BadRequestProblem(detail="Username already taken")
+    # a lookup before signup may have cached the name as unknown
+    await username_resolver.invalidate(new_user.username)
     return {"status": status.HTTP_201_CREATED}
\ No newline at end of file
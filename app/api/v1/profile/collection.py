@@ -1,10 +1,14 @@
-from fastapi import APIRouter, status, Form, Cookie
-from app.schemas import RecList, RecListConfig
+from fastapi import APIRouter, status, Form, Cookie, Query
+from app.schemas import RecList, RecListConfig, User
+from beanie import Link, PydanticObjectId
+from bson import DBRef
 from typing import Annotated
 from app.utils.decorators import auth_user
 from app.utils.handlers import QueryHandler
+from app.utils.cache_patches import append_to_pages
+from app.db.codecs import to_primitive
 from app.utils.fastapi_class_view import View
-from app.security.token import get_current_user
+from app.security.config import settings
 
 router = APIRouter()
 
@@ -17,15 +21,16 @@ class UserCollectionsView(QueryHandler):
     @auth_user
     async def get(
             self, 
+            limit: int = Query(settings.PAGE_SIZE, ge=1, le=settings.PAGE_SIZE_MAX),
+            cursor: str | None = None,
             access_token: str | None = Cookie(default=None)
         ):
-        redis_query = await self.redis_query(self.user_id)
+        redis_query = await self.redis_query_page(self.user_id, limit, cursor)
         
         if redis_query:
             response = redis_query
         if not redis_query:
-            response = await self.update_redis_list(self.user_id)
-        await self.redis.close_redis()
+            response = await self.update_redis_page(self.user_id, limit, cursor)
         return response
     
     @auth_user
@@ -34,17 +39,19 @@ class UserCollectionsView(QueryHandler):
             name: Annotated[str, Form(...)],
             access_token: str | None = Cookie(default=None)
         ):
-        current_user_id = get_current_user(access_token)
-
+        owner = DBRef(User.Settings.name, PydanticObjectId(self.user_id))
         new_reclist = self.RESPONSE_MODEL(
             name=name, 
-            user_id=current_user_id, 
+            user=Link(owner, User), 
             config=RecListConfig()
         )
         created = await self.RESPONSE_MODEL.insert(new_reclist)
 
-        await self.redis.open()
-        await self.delete_redis_item(self.user_id)
-        await self.redis.close_redis()
+        await self.write_through(
+                self.cache_keys(self.key, self.user_id),
+                append_to_pages(to_primitive(created)),
+                hashed=True,
+                tags=[self.profile_page_tag()]
+            )
 
         return {"status": status.HTTP_201_CREATED, "created": created}
\ No newline at end of file
@@ -4,9 +4,10 @@ from typing import Annotated
 from fastapi_class import endpoint
 from app.utils.decorators import auth_user
 from app.utils.handlers import QueryHandler
+from app.utils.cache_patches import replace_value, replace_in_pages, drop_from_pages
+from app.db.codecs import to_primitive
 from app.utils.fastapi_class_view import View
 from .collection import UserCollectionsView
-from app.security.token import authorize_user
 
 router = APIRouter()
 
@@ -16,6 +17,27 @@ class UserCollectionItemView(QueryHandler):
     RESPONSE_MODEL  = RecList
     parent_view     = UserCollectionsView       # auth_collections_{user.id}
     key             = "collections_detail"      # auth_collections_detail_{reclist.id}
+    child_key       = "collections_detail_recs" # auth_collections_detail_recs_{reclist.id}
+    scope           = "reclist"
+
+    async def patch_cached(self, reclist_id: str, item: dict, tags: tuple = ()) -> None:
+        # the collection and its entry in the owner's collection pages
+        await self.write_through(self.cache_keys(self.key, reclist_id), replace_value(item))
+        await self.write_through(
+                self.cache_keys(self.parent_view.key, self.user_id),
+                replace_in_pages(item),
+                hashed=True,
+                tags=tags
+            )
+
+    async def drop_cached(self, reclist_id: str) -> None:
+        # the list, its recs, and its entry in the owner's collection pages
+        await self.invalidate(f"reclist_{reclist_id}", self.profile_page_tag())
+        await self.write_through(
+                self.cache_keys(self.parent_view.key, self.user_id),
+                drop_from_pages(reclist_id),
+                hashed=True
+            )
 
     @auth_user
     async def get(
@@ -23,6 +45,7 @@ class UserCollectionItemView(QueryHandler):
             reclist_id: str, 
             access_token: str | None = Cookie(default=None)
         ):
+        await self.authorize_reclist(reclist_id)
         redis_query = await self.redis_query(reclist_id)
         
         if redis_query:
@@ -30,7 +53,6 @@ class UserCollectionItemView(QueryHandler):
         if not redis_query:
             response = await self.update_redis_item(reclist_id)
 
-        await self.redis.close_redis()
         if not response:
             raise self.not_found()
         return response
@@ -48,7 +70,7 @@ class UserCollectionItemView(QueryHandler):
         except:
             raise self.not_found()
   
-        if not authorize_user(access_token, reclist.user_id):
+        if not self.owns(reclist):
             raise self.unauthorized()
             
         if reclist_form.name is not None:
@@ -57,11 +79,7 @@ class UserCollectionItemView(QueryHandler):
             reclist.about = reclist_form.about
         await reclist.replace()
 
-
-        await self.redis.open()
-        await self.delete_redis_item(reclist_id)
-        await self.delete_redis_parent(self.user_id)
-        await self.redis.close_redis()
+        await self.patch_cached(reclist_id, to_primitive(reclist), tags=[self.profile_page_tag()])
 
         return {"status": status.HTTP_200_OK}
 
@@ -79,16 +97,29 @@ class UserCollectionItemView(QueryHandler):
             raise self.not_found()
 
 
-        if not authorize_user(access_token, reclist.user_id):
+        if not self.owns(reclist):
             raise self.unauthorized()
             
         reclist.private = private
         await reclist.replace()
 
-        await self.redis.open()
-        await self.delete_redis_item(reclist_id)
-        await self.delete_redis_parent(self.user_id)
-        await self.redis.close_redis()
+        item = to_primitive(reclist)
+        await self.write_through([f"auth_{self.key}_{reclist_id}"], replace_value(item))
+        await self.write_through(
+                [f"auth_{self.parent_view.key}_{self.user_id}"],
+                replace_in_pages(item),
+                hashed=True
+            )
+        public_pages = f"public_{self.parent_view.key}_{self.user_id}"
+        if private:
+            await self.write_through([public_pages], drop_from_pages(reclist_id), hashed=True)
+        else:
+            # would have to be slotted back in order, let the next read do it
+            await self.invalidate(keys=[public_pages])
+        await self.invalidate(
+                self.profile_page_tag(),
+                keys=[f"public_{self.key}_{reclist_id}", f"public_{self.child_key}_{reclist_id}"]
+            )
  
             
         return {"status": status.HTTP_200_OK}
@@ -106,16 +137,15 @@ class UserCollectionItemView(QueryHandler):
         except:
             raise self.not_found()
 
-        if not authorize_user(access_token, reclist.user_id):
+        if not self.owns(reclist):
             raise self.unauthorized()
             
         reclist.config = config_form
         await reclist.replace()
 
-        await self.redis.open()
-        await self.delete_redis_item(reclist_id)
-        await self.delete_redis_parent(self.user_id)
-        await self.redis.close_redis()
+        await self.patch_cached(reclist_id, to_primitive(reclist))
+        # rec cards carry the fields the config switches on, refetch them
+        await self.invalidate(self.redis_tag(reclist_id, child=True), self.profile_page_tag())
             
         return {"status": status.HTTP_200_OK}
 
@@ -130,15 +160,12 @@ class UserCollectionItemView(QueryHandler):
             reclist = await self.RESPONSE_MODEL.get(reclist_id)
         except:
             raise self.not_found()
-        if not authorize_user(access_token, reclist.user_id):
-            raise self.unoauthorized()
+        if not self.owns(reclist):
+            raise self.unauthorized()
         
         reclist.deleted = True
         await reclist.replace()
 
-        await self.redis.open()
-        await self.delete_redis_item(reclist_id)
-        await self.delete_redis_parent(self.user_id)
-        await self.redis.close_redis()
+        await self.drop_cached(reclist_id)
 
         return {"status": status.HTTP_200_OK}
\ No newline at end of file
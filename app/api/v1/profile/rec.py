@@ -1,55 +1,135 @@
-from fastapi import APIRouter, status, Cookie
-from app.schemas import Rec
+from fastapi import APIRouter, Request, status, Cookie, Query, Header
+from beanie import Link
+from bson import DBRef
+from app.schemas import Rec, RecCard, RecForm, RecList
 from app.utils.decorators import auth_user
-from app.utils.handlers import QueryHandler
+from app.utils.handlers import RecQueryHandler
+from app.utils.cache_patches import append_to_pages, drop_from_pages
+from app.db.codecs import to_primitive
+from app.utils.streaming import NDJSON
+from app.utils.bulk import read_body, parse_documents, insert_documents
 from app.utils.fastapi_class_view import View
+from fastapi_class import endpoint
 from .collection_detail import UserCollectionItemView
-from app.security.token import authorize_user
+from app.security.config import settings
 
 router = APIRouter()
 
 # GET & POST COLLECTION RECS
 @View(router, path="/collections/{reclist_id}/recs")
-class UserRecsView(QueryHandler):
+class UserRecsView(RecQueryHandler):
     RESPONSE_MODEL  = Rec
     parent_view     = UserCollectionItemView        # auth_collections_{reclist.id} 
     key             = "collections_detail_recs"     # auth_collections_{rec.id}
+    scope           = "reclist"
+
+    async def drop_cached_rec(self, reclist_id: str, rec_id: str) -> None:
+        # its card on the list's pages and its own detail field
+        await self.write_through(
+                self.cache_keys(self.key, reclist_id),
+                drop_from_pages(rec_id, f"rec:{rec_id}"),
+                hashed=True,
+                tags=[self.profile_page_tag()]
+            )
 
     @auth_user
     async def get(
             self, 
             reclist_id: str, 
+            limit: int = Query(settings.PAGE_SIZE, ge=1, le=settings.PAGE_SIZE_MAX),
+            cursor: str | None = None,
+            stream: bool = False,
+            accept: str | None = Header(default=None),
             access_token: str | None = Cookie(default=None)
         ):
+        await self.authorize_reclist(reclist_id)
+        if stream or (accept and NDJSON in accept):
+            return await self.stream_list(reclist_id, cursor, accept)
 
-        redis_query = await self.redis_query(self.user_id)
+        redis_query = await self.redis_query_page(reclist_id, limit, cursor)
 
         if redis_query:
             response = redis_query
         if not redis_query:
-            response = await self.update_redis_item(reclist_id)
-
-        await self.redis.close_redis()
+            response = await self.update_redis_page(reclist_id, limit, cursor)
 
-        if not response:
-            raise self.not_found()
         return response
+
+    @endpoint(("GET"), path="/{rec_id}")
+    @auth_user
+    async def get_item(
+            self,
+            reclist_id: str,
+            rec_id: str,
+            access_token: str | None = Cookie(default=None)
+        ):
+        return await self.rec_item(reclist_id, rec_id)
     
     @auth_user
     async def post(
             self,
             reclist_id: str,
-            rec_form: Rec,
+            rec_form: RecForm,
             access_token: str | None = Cookie(default=None)
         ):
-        created = await self.RESPONSE_MODEL.insert(rec_form)
+        reclist = await self.query_reclist(reclist_id)
+        # already validated and sanitized as a RecForm, owner and collection
+        # come from the caller and the URL
+        rec = self.RESPONSE_MODEL.model_construct(
+                **dict(rec_form),
+                user=reclist.user,
+                reclist=Link(DBRef(RecList.Settings.name, reclist.id), RecList)
+            )
+        created = await self.RESPONSE_MODEL.insert(rec)
 
-        await self.redis.open()
-        await self.update_redis_list(reclist_id)
-        await self.redis.close_redis()
+        card = RecCard.for_config(reclist.config).from_rec(created)
+        await self.write_through(
+                self.cache_keys(self.key, reclist_id),
+                append_to_pages(to_primitive(card)),
+                hashed=True,
+                tags=[self.profile_page_tag()]
+            )
 
         return {"status": status.HTTP_201_CREATED, "created": created}
 
+    @endpoint(("POST"), path="/import", name="import_recs")
+    @auth_user
+    async def import_recs(
+            self,
+            reclist_id: str,
+            request: Request,
+            access_token: str | None = Cookie(default=None)
+        ):
+        # a JSON array, or NDJSON (one rec per line) by content type
+        reclist = await self.query_reclist(reclist_id)
+
+        try:
+            body = await read_body(request, settings.IMPORT_MAX_BYTES)
+            items = parse_documents(body, NDJSON in request.headers.get("content-type", ""))
+        except ValueError as error:
+            raise self.bad_request(detail=str(error))
+
+        if len(items) > settings.IMPORT_MAX_ITEMS:
+            raise self.bad_request(detail=f"Import at most {settings.IMPORT_MAX_ITEMS} recs at a time")
+
+        inserted, errors = await insert_documents(
+                self.RESPONSE_MODEL,
+                items,
+                {"user": reclist.user, "reclist": Link(DBRef(RecList.Settings.name, reclist.id), RecList)},
+                settings.IMPORT_BATCH_SIZE
+            )
+
+        if inserted:
+            # pages shift by arbitrary amounts, one drop beats patching each rec in
+            await self.invalidate(self.redis_tag(reclist_id), self.profile_page_tag())
+
+        return {
+            "status": status.HTTP_201_CREATED if inserted else status.HTTP_200_OK,
+            "inserted": inserted,
+            "failed": len(errors),
+            "errors": errors
+        }
+
     @auth_user
     async def delete(
             self, 
@@ -62,14 +142,15 @@ class UserRecsView(QueryHandler):
         except:
             raise self.not_found()
 
-        if not authorize_user(access_token, rec.user_id):
+        if not self.owns(rec):
             raise self.unauthorized()
+        # the pages patched below are the URL's collection's
+        if str(rec.reclist.ref.id) != reclist_id:
+            raise self.not_found()
         
         rec.deleted = True
         await rec.replace()
 
-        await self.redis.open()
-        await self.delete_redis_parent(reclist_id)
-        await self.redis.close_redis()
+        await self.drop_cached_rec(reclist_id, rec_id)
             
         return {"status": status.HTTP_200_OK}
\ No newline at end of file
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Cookie, Query
+from typing import Annotated
+from app.schemas import Rec, RecSearch
+from app.utils.decorators import auth_user
+from app.utils.handlers import QueryHandler
+from app.utils.fastapi_class_view import View
+
+router = APIRouter()
+
+# SEARCH USER RECS
+@View(router, path="/search")
+class UserSearchView(QueryHandler):
+    RESPONSE_MODEL  = Rec
+
+    @auth_user
+    async def get(
+            self,
+            search: Annotated[RecSearch, Query()],
+            access_token: str | None = Cookie(default=None)
+        ):
+        return await self.RESPONSE_MODEL.search(self.user_id, search)
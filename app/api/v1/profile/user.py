@@ -1,8 +1,12 @@
-from fastapi import APIRouter, status, Cookie
+from fastapi import APIRouter, status, Cookie, UploadFile
+from pymongo.errors import DuplicateKeyError
 from app.schemas import User, UserProfileForm, UsernameForm, PasswordForm
 from app.utils.fastapi_class_view import View
 from app.utils.handlers import QueryHandler
 from app.utils.decorators import auth_user
+from app.utils.resolver import username_resolver
+from app.db.avatars import avatar_storage
+from app.security.config import settings
 from fastapi_class import endpoint
 
 router = APIRouter()
@@ -23,7 +27,6 @@ class UserProfileView(QueryHandler):
             response = redis_query
         if not redis_query:
             response = await self.update_redis_item(self.user_id)
-        await self.redis.close_redis()
 
         return response
     
@@ -35,78 +38,102 @@ class UserProfileView(QueryHandler):
             access_token: str | None = Cookie(default=None)
         ):
         try:
-            user = User.get(self.user_id)
+            user = await User.get(self.user_id)
         except:
             raise self.server_problem()
         
         if user_form.bio:
             user.bio = user_form.bio
-        if user_form.avatar:
-            user_form.avatar = user_form.avatar
         await user.replace()
 
-        await self.redis.open()
         await self.delete_redis_item(self.user_id)
-        await self.redis.close_redis()
     
-    @endpoint(("PUT"), path="/username")
+    @endpoint(("PUT"), path="avatar")
     @auth_user
-    async def update(
+    async def update_avatar(
+            self,
+            avatar: UploadFile,
+            access_token: str | None = Cookie(default=None)
+        ):
+        data = await avatar.read(settings.AVATAR_MAX_BYTES + 1)
+        if len(data) > settings.AVATAR_MAX_BYTES:
+            raise self.bad_request(detail="Avatar is too large")
+
+        try:
+            version = await avatar_storage.save(self.user_id, data)
+        except ValueError:
+            raise self.bad_request(detail="Avatar must be an image")
+
+        user = await User.get(self.user_id)
+        user.avatar_version = version
+        await user.replace()
+
+        await self.delete_redis_item(self.user_id)
+
+        return {"status": status.HTTP_200_OK, "avatar_urls": user.avatar_urls}
+
+    @endpoint(("PUT"), path="username")
+    @auth_user
+    async def update_username(
             self, 
             username_form: UsernameForm,
             access_token: str | None = Cookie(default=None)
         ):
-        user = User.get(self.user_id)
+        user = await User.get(self.user_id)
 
         user_exists = await User.find_by_username(username_form.username)
         if user_exists:
             raise self.bad_request(detail="Username already taken")
-   
+
+        old_username = user.username
         user.username = username_form.username
-        await user.replace()
+        try:
+            await user.replace()
+        except DuplicateKeyError:
+            # taken since the check above, username_unique caught it
+            raise self.bad_request(detail="Username already taken")
 
-        await self.redis.open()
         await self.delete_redis_item(self.user_id)
-        await self.redis.close_redis()
+        # the new name may be negatively cached from before it was taken
+        await username_resolver.invalidate(old_username, user.username)
 
     
-    @endpoint(("PUT"), path="/password")
+    @endpoint(("PUT"), path="password", name="update_password")
     @auth_user
-    async def update(
+    async def update_password(
             self, 
             password_form: PasswordForm,
             access_token: str | None = Cookie(default=None)
         ):
         try:
-            user = User.get(self.user_id)
+            user = await User.get(self.user_id)
         except:
             raise self.server_problem()
         
         if password_form.password != password_form.match_password:
             raise self.bad_request()
 
-        user.password = PasswordForm.hash_password(password_form.password)
+        user.password = await PasswordForm.hash_password(password_form.password)
         await user.replace()
 
     @endpoint(("PUT"), path="deactivate")
     @auth_user
-    async def update(
+    async def deactivate(
             self, 
             access_token: str | None = Cookie(default=None)
         ):
         try:
-            user = User.get(self.user_id)
+            user = await User.get(self.user_id)
         except:
             raise self.server_problem()
 
+        user.is_active = False
+        await user.replace()
+        await username_resolver.invalidate(user.username)
+
         try:
-            self.redis_deactivate()
+            await self.redis_deactivate()
         except:
             raise self.server_problem()
-        
-        await self.redis.close_redis()
-
-        user.is_active = True
-        await user.replace()
 
         return {"status": status.HTTP_200_OK}
\ No newline at end of file
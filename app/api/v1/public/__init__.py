@@ -2,8 +2,14 @@ from fastapi import APIRouter
 from .profile import router as profile_router
 from .collection import router as collection_router
 from .collection_detail import router as collection_detail_router
+from .search import router as search_router
+from .profile_page import router as profile_page_router
+from .avatar import router as avatar_router
 
 public_router = APIRouter(prefix="", tags=["public"])
+public_router.include_router(avatar_router)
 public_router.include_router(profile_router)
 public_router.include_router(collection_router)
-public_router.include_router(collection_detail_router)
\ No newline at end of file
+public_router.include_router(collection_detail_router)
+public_router.include_router(search_router)
+public_router.include_router(profile_page_router)
\ No newline at end of file
@@ -0,0 +1,87 @@
+from fastapi import APIRouter, Header, Response, status
+from beanie import PydanticObjectId
+import hashlib
+from app.db.avatars import AVATAR_SIZES, AVATAR_CONTENT_TYPE, avatar_storage
+from app.schemas import User, UserRef
+from app.utils.fastapi_class_view import View
+from app.utils.handlers import QueryHandler
+
+router = APIRouter()
+
+# only a URL carrying the current version can be cached for good, a stale
+# or missing one has to be checked again soon
+VERSIONED_CACHE = "public, max-age=31536000, immutable"
+UNVERSIONED_CACHE = "public, max-age=300, must-revalidate"
+
+
+def parse_range(header: str, length: int) -> tuple[int, int] | None:
+    # single byte ranges only, anything else is served whole; raises
+    # ValueError when the range can't be satisfied
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    if not first:
+        suffix = int(last)
+        if suffix <= 0:
+            raise ValueError("empty range")
+        return max(0, length - suffix), length - 1
+    start = int(first)
+    end = int(last) if last else length - 1
+    if start >= length or end < start:
+        raise ValueError("range out of bounds")
+    return start, min(end, length - 1)
+
+
+# GET USER AVATAR
+@View(router, path="/avatars/{user_id}/{size}")
+class AvatarView(QueryHandler):
+
+    async def get(
+            self,
+            user_id: PydanticObjectId,
+            size: str,
+            v: str | None = None,
+            range_header: str | None = Header(default=None, alias="Range"),
+            if_none_match: str | None = Header(default=None)
+        ):
+        if size not in AVATAR_SIZES:
+            raise self.not_found()
+
+        user = await User.find_one(User.id == user_id, projection_model=UserRef)
+        if not user or not user.is_active or not user.avatar_version:
+            raise self.not_found()
+
+        data = await avatar_storage.load(str(user_id), size)
+        if data is None:
+            raise self.not_found()
+
+        etag = f'"{hashlib.blake2b(data, digest_size=8).hexdigest()}"'
+        headers = {
+            "ETag": etag,
+            "Cache-Control": VERSIONED_CACHE if v == user.avatar_version else UNVERSIONED_CACHE,
+            "Accept-Ranges": "bytes",
+        }
+
+        if if_none_match and etag in if_none_match:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        if range_header:
+            try:
+                byte_range = parse_range(range_header, len(data))
+            except ValueError:
+                return Response(
+                    status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                    headers={"Content-Range": f"bytes */{len(data)}"}
+                )
+            if byte_range:
+                start, end = byte_range
+                headers["Content-Range"] = f"bytes {start}-{end}/{len(data)}"
+                return Response(
+                    content=data[start:end + 1],
+                    status_code=status.HTTP_206_PARTIAL_CONTENT,
+                    media_type=AVATAR_CONTENT_TYPE,
+                    headers=headers
+                )
+
+        return Response(content=data, media_type=AVATAR_CONTENT_TYPE, headers=headers)
@@ -1,8 +1,9 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Query
 from app.schemas import RecList
 from app.utils.fastapi_class_view import View
 from app.utils.handlers import QueryHandler
 from app.utils.decorators import public_user
+from app.security.config import settings
 
 router = APIRouter()
 
@@ -10,17 +11,21 @@ router = APIRouter()
 class PublicProfileView(QueryHandler):
     RESPONSE_MODEL  = RecList
     key             = "collections"   # public_collections_{user.id}
+    near_cached     = True
 
     @public_user
-    async def get(self, username: str):
-        redis_query = await self.redis_query(self.user_id)
+    async def get(
+            self,
+            username: str,
+            limit: int = Query(settings.PAGE_SIZE, ge=1, le=settings.PAGE_SIZE_MAX),
+            cursor: str | None = None,
+        ):
+        redis_query = await self.redis_query_page(self.user_id, limit, cursor)
 
         
         if redis_query:
             response = redis_query
         if not redis_query:
-            response = await self.update_redis_list(self.user_id)
-
-        await self.redis.close_redis()
+            response = await self.update_redis_page(self.user_id, limit, cursor)
 
         return response
\ No newline at end of file
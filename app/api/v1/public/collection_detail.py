@@ -1,25 +1,47 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Query, Header
+from fastapi_class import endpoint
 from app.schemas import Rec
 from app.utils.fastapi_class_view import View
-from app.utils.handlers import QueryHandler
+from app.utils.handlers import RecQueryHandler
+from app.utils.streaming import NDJSON
 from app.utils.decorators import public_user
+from app.security.config import settings
 
 router = APIRouter()
 
 # GET USER COLLECTION RECS
 @View(router, path="/{username}/collections/{reclist_id}")
-class PublicRecsView(QueryHandler):
+class PublicRecsView(RecQueryHandler):
     RESPONSE_MODEL  = Rec
-    key             = "collection_detail_recs"   # public_collections_recs_{reclist.id}
+    key             = "collections_detail_recs"  # public_collections_detail_recs_{reclist.id}
+    scope           = "reclist"
+    near_cached     = True
 
+    @endpoint(("GET"), name="public_recs")
     @public_user
-    async def get(self, username: str, reclist_id: str):
-        redis_query = await self.redis_query(reclist_id)
+    async def get(
+            self,
+            username: str,
+            reclist_id: str,
+            limit: int = Query(settings.PAGE_SIZE, ge=1, le=settings.PAGE_SIZE_MAX),
+            cursor: str | None = None,
+            stream: bool = False,
+            accept: str | None = Header(default=None),
+        ):
+        await self.authorize_reclist(reclist_id)
+        if stream or (accept and NDJSON in accept):
+            return await self.stream_list(reclist_id, cursor, accept)
+
+        redis_query = await self.redis_query_page(reclist_id, limit, cursor)
         
         if redis_query:
             response = redis_query
         if not redis_query:
-            response = await self.update_redis_list(reclist_id)
+            response = await self.update_redis_page(reclist_id, limit, cursor)
+
+        return response
 
-        await self.redis.close_redis()
-        return response
\ No newline at end of file
+    @endpoint(("GET"), path="/recs/{rec_id}", name="public_rec")
+    @public_user
+    async def get_item(self, username: str, reclist_id: str, rec_id: str):
+        return await self.rec_item(reclist_id, rec_id)
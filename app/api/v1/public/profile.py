@@ -11,6 +11,7 @@ router = APIRouter()
 class ProfileView(QueryHandler):
     RESPONSE_MODEL  = User
     key             = "profile"   # public_profile_{user.id}
+    near_cached     = True
 
     @public_user
     async def get(self, username: str):
@@ -20,5 +21,4 @@ class ProfileView(QueryHandler):
             response = redis_query
         if not redis_query:
             response = await self.update_redis_item(self.user_id)
-            await self.redis.close_redis()
         return response
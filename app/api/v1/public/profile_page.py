@@ -0,0 +1,32 @@
+from fastapi import APIRouter
+from app.schemas import ProfilePage
+from app.utils.fastapi_class_view import View
+from app.utils.handlers import QueryHandler
+from app.utils.decorators import public_user
+
+router = APIRouter()
+
+# GET USER PROFILE, COLLECTIONS AND FIRST RECS
+@View(router, path="/{username}/overview")
+class ProfilePageView(QueryHandler):
+    RESPONSE_MODEL  = ProfilePage
+    key             = "profile_page"   # public_profile_page_{user.id}
+    near_cached     = True
+
+    def redis_tags(self, query_id: str) -> list:
+        # profile edits drop the profile family, collection and rec
+        # mutations drop profile_page_{user.id} (see profile_page_tag)
+        return super().redis_tags(query_id) + [f"profile_{query_id}"]
+
+    @public_user
+    async def get(self, username: str):
+        redis_query = await self.redis_query(self.user_id)
+
+        if redis_query:
+            response = redis_query
+        if not redis_query:
+            response = await self.update_redis_item(self.user_id)
+
+        if not response:
+            raise self.not_found()
+        return response
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Query
+from fastapi_class import endpoint
+from typing import Annotated
+from app.schemas import Rec, RecSearch
+from app.utils.decorators import public_user
+from app.utils.handlers import QueryHandler
+from app.utils.fastapi_class_view import View
+
+router = APIRouter()
+
+# SEARCH USER PUBLIC RECS
+@View(router, path="/{username}/search")
+class PublicSearchView(QueryHandler):
+    RESPONSE_MODEL  = Rec
+
+    @endpoint(("GET"), name="public_search")
+    @public_user
+    async def get(self, username: str, search: Annotated[RecSearch, Query()]):
+        return await self.RESPONSE_MODEL.search(self.user_id, search, self.public)
@@ -0,0 +1,119 @@
+import asyncio
+import hashlib
+import os
+from io import BytesIO
+from motor.motor_asyncio import AsyncIOMotorDatabase, AsyncIOMotorGridFSBucket
+from gridfs.errors import NoFile
+from PIL import Image, ImageOps, UnidentifiedImageError
+from app.security.config import settings
+
+AVATAR_SIZES = {"small": 64, "medium": 256, "large": 512}
+AVATAR_CONTENT_TYPE = "image/webp"
+
+
+def avatar_version(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def render_thumbnails(data: bytes) -> dict:
+    """Square-crops an uploaded image into every size in AVATAR_SIZES.
+
+    Raises ValueError when the upload is not an image Pillow can read.
+    """
+    try:
+        image = Image.open(BytesIO(data))
+        image.load()
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        raise ValueError("not a valid image")
+
+    image = ImageOps.exif_transpose(image).convert("RGBA")
+    thumbnails = {}
+    for name, pixels in AVATAR_SIZES.items():
+        thumbnail = ImageOps.fit(image, (pixels, pixels), Image.Resampling.LANCZOS)
+        buffer = BytesIO()
+        thumbnail.save(buffer, format="WEBP", quality=85)
+        thumbnails[name] = buffer.getvalue()
+    return thumbnails
+
+
+class GridFSAvatarStore:
+    def __init__(self, database: AsyncIOMotorDatabase):
+        self.bucket = AsyncIOMotorGridFSBucket(database, bucket_name="avatars")
+
+    async def put(self, user_id: str, size: str, data: bytes) -> None:
+        filename = f"{user_id}/{size}"
+        old_files = await self.bucket.find({"filename": filename}).to_list(None)
+        await self.bucket.upload_from_stream(
+            filename,
+            data,
+            metadata={"contentType": AVATAR_CONTENT_TYPE}
+        )
+        for old_file in old_files:
+            await self.bucket.delete(old_file._id)
+
+    async def get(self, user_id: str, size: str) -> bytes | None:
+        try:
+            stream = await self.bucket.open_download_stream_by_name(f"{user_id}/{size}")
+        except NoFile:
+            return None
+        return await stream.read()
+
+
+class DiskAvatarStore:
+    """Local directory standing in for object storage."""
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, user_id: str, size: str) -> str:
+        return os.path.join(self.root, user_id, f"{size}.webp")
+
+    def _write(self, path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write then rename so readers never see half a file
+        temporary = f"{path}.tmp"
+        with open(temporary, "wb") as file:
+            file.write(data)
+        os.replace(temporary, path)
+
+    def _read(self, path: str) -> bytes | None:
+        try:
+            with open(path, "rb") as file:
+                return file.read()
+        except FileNotFoundError:
+            return None
+
+    async def put(self, user_id: str, size: str, data: bytes) -> None:
+        await asyncio.to_thread(self._write, self.path(user_id, size), data)
+
+    async def get(self, user_id: str, size: str) -> bytes | None:
+        return await asyncio.to_thread(self._read, self.path(user_id, size))
+
+
+class AvatarStorage:
+    """Avatar thumbnails, kept out of the user document.
+
+    The backend is picked by AVATAR_STORAGE when the lifespan opens it.
+    """
+    def __init__(self):
+        self.store: GridFSAvatarStore | DiskAvatarStore | None = None
+
+    def open(self, database: AsyncIOMotorDatabase) -> None:
+        match settings.AVATAR_STORAGE:
+            case "gridfs":
+                self.store = GridFSAvatarStore(database)
+            case "disk":
+                self.store = DiskAvatarStore(settings.AVATAR_DIR)
+            case other:
+                raise ValueError(f"unknown avatar storage {other!r}")
+
+    async def save(self, user_id: str, data: bytes) -> str:
+        thumbnails = await asyncio.to_thread(render_thumbnails, data)
+        for size, thumbnail in thumbnails.items():
+            await self.store.put(user_id, size, thumbnail)
+        return avatar_version(data)
+
+    async def load(self, user_id: str, size: str) -> bytes | None:
+        return await self.store.get(user_id, size)
+
+
+avatar_storage = AvatarStorage()
@@ -0,0 +1,144 @@
+import abc
+import hashlib
+import pickle
+import msgpack
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+
+
+def to_primitive(value):
+    # same output as jsonable_encoder, without its second pass over models
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json", by_alias=True)
+    if isinstance(value, (list, tuple)):
+        return [to_primitive(item) for item in value]
+    return jsonable_encoder(value)
+
+
+class Codec(abc.ABC):
+    """Turns cached values into bytes and back.
+
+    Values are stored as their JSON-compatible form (what FastAPI would send
+    in the response), so cached payloads don't carry Beanie or Pydantic
+    internals and survive model changes.
+    """
+    name: str = ""
+    renders_json: bool = False
+
+    @abc.abstractmethod
+    def dumps(self, value) -> bytes:
+        ...
+
+    @abc.abstractmethod
+    def loads(self, payload: bytes):
+        ...
+
+    def render(self, payload: bytes) -> bytes:
+        # JSON response body for a stored payload
+        if self.renders_json:
+            return payload
+        return orjson.dumps(self.loads(payload))
+
+
+class OrjsonCodec(Codec):
+    name = "orjson"
+    renders_json = True
+
+    def dumps(self, value) -> bytes:
+        return orjson.dumps(to_primitive(value))
+
+    def loads(self, payload: bytes):
+        return orjson.loads(payload)
+
+
+class MsgpackCodec(Codec):
+    name = "msgpack"
+
+    def dumps(self, value) -> bytes:
+        return msgpack.packb(to_primitive(value))
+
+    def loads(self, payload: bytes):
+        return msgpack.unpackb(payload)
+
+
+class PickleCodec(Codec):
+    name = "pickle"
+
+    def dumps(self, value) -> bytes:
+        return pickle.dumps(value)
+
+    def loads(self, payload: bytes):
+        return pickle.loads(payload)
+
+    def render(self, payload: bytes) -> bytes:
+        return orjson.dumps(to_primitive(self.loads(payload)))
+
+
+CODECS = {
+    codec.name: codec
+    for codec in (OrjsonCodec(), MsgpackCodec(), PickleCodec())
+}
+
+
+def get_codec(name: str) -> Codec:
+    try:
+        return CODECS[name]
+    except KeyError:
+        raise ValueError(f"unknown cache codec {name!r}, expected one of {sorted(CODECS)}")
+
+
+ETAG_LENGTH = 16
+
+
+def content_hash(payload: bytes) -> bytes:
+    return hashlib.blake2b(payload, digest_size=ETAG_LENGTH // 2).hexdigest().encode()
+
+
+class VersionedCodec:
+    """Prefixes payloads with the schema version, codec name and a hash of
+    the payload, which doubles as the response ETag.
+
+    Payloads written by another version or codec read back as a miss, so
+    bumping REDIS_CACHE_SCHEMA_VERSION retires every old entry at once.
+    """
+    def __init__(self, codec: Codec, version: int):
+        self.codec = codec
+        self.header = f"{version}:{codec.name}:".encode()
+
+    def encode(self, value) -> bytes:
+        payload = self.codec.dumps(value)
+        return self.header + content_hash(payload) + payload
+
+    def valid(self, data: bytes | None) -> bool:
+        return bool(data) and data.startswith(self.header)
+
+    def payload(self, data: bytes | None) -> bytes | None:
+        if not self.valid(data):
+            return None
+        return data[len(self.header) + ETAG_LENGTH:]
+
+    def etag(self, data: bytes | None) -> str | None:
+        if not self.valid(data):
+            return None
+        start = len(self.header)
+        return data[start:start + ETAG_LENGTH].decode()
+
+    def decode(self, data: bytes | None):
+        payload = self.payload(data)
+        if payload is None:
+            return None
+        return self.codec.loads(payload)
+
+    def render(self, data: bytes | None) -> bytes | None:
+        payload = self.payload(data)
+        if payload is None:
+            return None
+        return self.codec.render(payload)
+
+    def render_tagged(self, data: bytes | None) -> tuple[bytes, str] | None:
+        # JSON body and ETag, or None for a miss
+        body = self.render(data)
+        if body is None:
+            return None
+        return body, self.etag(data)
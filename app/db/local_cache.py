@@ -0,0 +1,44 @@
+from collections import OrderedDict
+import time
+
+
+class LocalCache:
+    """Size-bounded in-process LRU where every entry expires after a TTL.
+
+    ``on_evict(key, value)`` is called for entries pushed out by size.
+    """
+    def __init__(self, maxsize: int, ttl: float, on_evict=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self._data: OrderedDict = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key, default=None):
+        item = self._data.get(key)
+        if item is None:
+            return default
+        expires, value = item
+        if expires < time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value, ttl: float | None = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            evicted, (_, evicted_value) = self._data.popitem(last=False)
+            if self.on_evict:
+                self.on_evict(evicted, evicted_value)
+
+    def delete(self, *keys) -> None:
+        for key in keys:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
@@ -1,25 +1,77 @@
+import logging
 from motor.motor_asyncio import AsyncIOMotorClient
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
 import certifi
 from beanie import init_beanie
 from app.schemas import User, RecList, Rec
+from app.db.redis import redis_pool
+from app.db.near_cache import near_cache
+from app.db.avatars import avatar_storage
+from app.db.monitoring import MongoCommandListener
+from app.utils.metrics import LoopLagMonitor
 
 from app.security.config import settings
 
+logger = logging.getLogger("uvicorn.error")
+DOCUMENT_MODELS = [User, RecList, Rec]
+loop_lag = LoopLagMonitor(settings.METRICS_LOOP_LAG_INTERVAL)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await startup_db_client(app)
+    await startup_redis_client(app)
+    if settings.METRICS_ENABLED:
+        loop_lag.start()
     yield
+    await loop_lag.stop()
+    await shutdown_redis_client(app)
     await shutdown_db_client(app)
 
 async def startup_db_client(app: FastAPI):
     app.mongodb_client = AsyncIOMotorClient(
         settings.MONGO_URI,
-        tlsCAFile=certifi.where()
+        tlsCAFile=certifi.where(),
+        maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+        event_listeners=[MongoCommandListener()] if settings.METRICS_ENABLED else []
     )
-    await init_beanie(database=app.mongodb_client.ficrec, document_models=[User, RecList, Rec])
+    # init_beanie also creates the indexes declared in each model's Settings
+    await init_beanie(database=app.mongodb_client.ficrec, document_models=DOCUMENT_MODELS)
+    await check_indexes(DOCUMENT_MODELS)
+    avatar_storage.open(app.mongodb_client.ficrec)
 
 async def shutdown_db_client(app: FastAPI):
-    app.mongodb_client.close()
\ No newline at end of file
+    app.mongodb_client.close()
+
+async def check_indexes(document_models: list) -> None:
+    for model in document_models:
+        collection = model.get_motor_collection()
+        declared = {index.name for index in model.get_settings().indexes}
+        existing = await collection.index_information()
+
+        missing = declared - existing.keys()
+        if missing:
+            logger.warning("%s is missing indexes: %s", collection.name, ", ".join(sorted(missing)))
+
+        try:
+            stats = await collection.aggregate([{"$indexStats": {}}]).to_list(None)
+        except Exception as error:
+            logger.info("index usage unavailable for %s: %s", collection.name, error)
+            continue
+
+        unused = sorted(
+            stat["name"] for stat in stats
+            if stat["name"] != "_id_" and stat["accesses"]["ops"] == 0
+        )
+        if unused:
+            logger.info("%s has unused indexes: %s", collection.name, ", ".join(unused))
+
+async def startup_redis_client(app: FastAPI):
+    await redis_pool.open()
+    app.redis_pool = redis_pool
+    await near_cache.open(redis_pool.client)
+
+async def shutdown_redis_client(app: FastAPI):
+    await near_cache.close()
+    await redis_pool.close()
@@ -0,0 +1,70 @@
+import time
+from pymongo import monitoring
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+from app.utils.metrics import (
+    mongodb_command_duration,
+    mongodb_command_failures,
+    redis_command_duration
+)
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Feeds MongoDB command durations into mongodb_command_duration."""
+    def __init__(self):
+        # only started events name the collection
+        self.collections: dict = {}
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        collection = event.command.get(event.command_name)
+        self.collections[(event.connection_id, event.request_id)] = (
+            collection if isinstance(collection, str) else ""
+        )
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        collection = self.collections.pop((event.connection_id, event.request_id), "")
+        mongodb_command_duration.observe(event.duration_micros / 1_000_000, collection, event.command_name)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        collection = self.collections.pop((event.connection_id, event.request_id), "")
+        mongodb_command_duration.observe(event.duration_micros / 1_000_000, collection, event.command_name)
+        mongodb_command_failures.inc(collection, event.command_name)
+
+
+def command_name(args: tuple) -> str:
+    name = args[0]
+    return (name.decode() if isinstance(name, bytes) else str(name)).upper()
+
+
+class TimedPipeline(Pipeline):
+    async def execute(self, raise_on_error: bool = True):
+        start = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            redis_command_duration.observe(
+                time.perf_counter() - start,
+                "MULTI" if self.is_transaction else "PIPELINE"
+            )
+
+    async def immediate_execute_command(self, *args, **options):
+        # WATCH and the reads after it, before MULTI
+        start = time.perf_counter()
+        try:
+            return await super().immediate_execute_command(*args, **options)
+        finally:
+            redis_command_duration.observe(time.perf_counter() - start, command_name(args))
+
+
+class TimedRedis(Redis):
+    """Redis client that times every round trip into redis_command_duration."""
+
+    async def execute_command(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            redis_command_duration.observe(time.perf_counter() - start, command_name(args))
+
+    def pipeline(self, transaction: bool = True, shard_hint: str | None = None) -> TimedPipeline:
+        return TimedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
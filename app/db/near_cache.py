@@ -0,0 +1,110 @@
+import asyncio
+import logging
+from redis.asyncio import Redis
+from app.db.local_cache import LocalCache
+from app.security.config import settings
+
+logger = logging.getLogger("uvicorn.error")
+
+
+class NearCache:
+    """Per-worker copy of hot cached responses, in front of Redis.
+
+    Entries are rendered JSON bodies and their ETags, keyed by Redis key (and
+    hash field for paged lists), so a hit skips both the round trip and
+    decoding. Redis publishes the keys each invalidation drops on
+    LOCAL_CACHE_CHANNEL and every worker evicts them; the short TTL bounds
+    staleness if a message is missed. Other per-worker caches of Redis keys
+    follow the same evictions through ``follow``.
+    """
+    def __init__(self, maxsize: int, ttl: float, channel: str, max_fields: int):
+        self.local = LocalCache(maxsize, ttl, on_evict=self.evicted)
+        self.max_fields = max_fields
+        self.channel = channel
+        self.counters: dict = {}
+        self.pubsub = None
+        self.listener: asyncio.Task | None = None
+        # objects with evict(keys) and clear(), told about every eviction
+        self.followers: list = []
+
+    def follow(self, follower) -> None:
+        self.followers.append(follower)
+
+    def count(self, family: str, counter: str) -> None:
+        if not settings.METRICS_ENABLED:
+            return
+        counters = self.counters.setdefault(family, {"hits": 0, "misses": 0, "evictions": 0})
+        counters[counter] += 1
+
+    def get(self, family: str, key: str, field: str | None = None) -> tuple[bytes, str] | None:
+        entry = self.local.get(key)
+        cached = entry[1].get(field) if entry else None
+        self.count(family, "hits" if cached is not None else "misses")
+        return cached
+
+    def set(self, family: str, key: str, field: str | None, cached: tuple[bytes, str]) -> None:
+        # hash fields share their key's entry, and its TTL
+        entry = self.local.get(key)
+        if entry is None:
+            entry = (family, {})
+            self.local.set(key, entry)
+        if field not in entry[1] and len(entry[1]) >= self.max_fields:
+            return
+        entry[1][field] = cached
+
+    def evicted(self, key: str, entry: tuple) -> None:
+        self.count(entry[0], "evictions")
+
+    def evict(self, keys: list) -> None:
+        keys = [key.decode() if isinstance(key, bytes) else key for key in keys]
+        self.local.delete(*keys)
+        for follower in self.followers:
+            follower.evict(keys)
+
+    def clear(self) -> None:
+        self.local.clear()
+        for follower in self.followers:
+            follower.clear()
+
+    def metrics(self) -> dict:
+        return {"size": len(self.local), "families": self.counters}
+
+    async def open(self, client: Redis) -> None:
+        self.pubsub = client.pubsub(ignore_subscribe_messages=True)
+        await self.pubsub.subscribe(self.channel)
+        self.listener = asyncio.create_task(self.listen())
+
+    async def close(self) -> None:
+        if self.listener is not None:
+            self.listener.cancel()
+            try:
+                await self.listener
+            except asyncio.CancelledError:
+                pass
+        if self.pubsub is not None:
+            await self.pubsub.aclose()
+        self.listener = None
+        self.pubsub = None
+        self.local.clear()
+
+    async def listen(self) -> None:
+        while True:
+            try:
+                async for message in self.pubsub.listen():
+                    if message["type"] == "message":
+                        self.evict(message["data"].split(b"\n"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                # anything published while we were disconnected is lost
+                logger.warning("cache invalidation listener failed: %s", error)
+                self.clear()
+                await asyncio.sleep(1)
+
+
+near_cache = NearCache(
+    settings.LOCAL_CACHE_SIZE,
+    settings.LOCAL_CACHE_TTL,
+    settings.LOCAL_CACHE_CHANNEL,
+    settings.PAGE_CACHE_MAX_FIELDS
+)
@@ -1,47 +1,289 @@
-from redis.asyncio import Redis
+import random
+from redis.asyncio import Redis, BlockingConnectionPool
+from redis.asyncio.lock import Lock
 from app.security.config import settings
-import pickle
+from app.db.codecs import VersionedCodec, get_codec, to_primitive
 from redis.retry import Retry
-from redis.exceptions import (TimeoutError, ConnectionError)
+from redis.exceptions import (TimeoutError, ConnectionError, WatchError)
 from redis.backoff import ExponentialBackoff
+from app.db.monitoring import TimedRedis
 
-class RedisClient:
+class RedisPool:
+    """App-wide Redis connection pool, opened once in the lifespan.
+
+    Every RedisClient borrows connections from here, so requests no longer
+    pay for a TCP handshake and AUTH on each cache lookup.
+    """
     def __init__(self):
-        super().__init__()
+        self.pool: BlockingConnectionPool | None = None
+        self.client: Redis | None = None
 
     async def open(self) -> None:
-        self.client = await Redis(
+        self.pool = BlockingConnectionPool(
+            max_connections=settings.REDIS_CACHE_MAX_CONNECTIONS,
+            timeout=settings.REDIS_CACHE_POOL_TIMEOUT,
             host=settings.REDIS_CACHE_HOST,
             port=settings.REDIS_CACHE_PORT,
             username=settings.REDIS_CACHE_USERNAME,
             password=settings.REDIS_CACHE_PASSWORD,
             decode_responses=False,
-            retry=Retry(ExponentialBackoff(cap=10, base=1), 25), 
+            retry=Retry(ExponentialBackoff(cap=10, base=1), 25),
             retry_on_error = [
-                ConnectionError, 
-                TimeoutError, 
+                ConnectionError,
+                TimeoutError,
                 ConnectionResetError
-            ], 
-            health_check_interval=1
+            ],
+            health_check_interval=settings.REDIS_CACHE_HEALTH_CHECK_INTERVAL
         )
+        client_class = TimedRedis if settings.METRICS_ENABLED else Redis
+        self.client = client_class(connection_pool=self.pool)
+
+    async def close(self) -> None:
+        if self.client is not None:
+            await self.client.aclose()
+        if self.pool is not None:
+            await self.pool.disconnect()
+        self.client = None
+        self.pool = None
+
+    async def health(self) -> bool:
+        try:
+            return await self.client.ping()
+        except (ConnectionError, TimeoutError, AttributeError):
+            return False
+
+    def metrics(self) -> dict:
+        if self.pool is None:
+            return {}
+        return {
+            "max_connections": self.pool.max_connections,
+            "in_use_connections": len(self.pool._in_use_connections),
+            "available_connections": len(self.pool._available_connections),
+        }
+
+
+redis_pool = RedisPool()
+cache_codec = VersionedCodec(
+    get_codec(settings.REDIS_CACHE_CODEC),
+    settings.REDIS_CACHE_SCHEMA_VERSION
+)
+
+
+# Drops every key registered under the first ARGV[1] KEYS (tag sets), the
+# tag sets and any remaining plain KEYS, in one round trip, then publishes
+# the dropped keys on ARGV[2] so workers evict their local copies. UNLINK
+# frees the memory off the main thread.
+INVALIDATE = """
+local function unlink(keys)
+    for i = 1, #keys, 500 do
+        redis.call("UNLINK", unpack(keys, i, math.min(i + 499, #keys)))
+    end
+end
+local tags = tonumber(ARGV[1])
+local dropped = {}
+for i = tags + 1, #KEYS do
+    dropped[#dropped + 1] = KEYS[i]
+end
+for i = 1, tags do
+    for _, member in ipairs(redis.call("SMEMBERS", KEYS[i])) do
+        dropped[#dropped + 1] = member
+    end
+    redis.call("UNLINK", KEYS[i])
+end
+unlink(dropped)
+if #dropped > 0 then
+    redis.call("PUBLISH", ARGV[2], table.concat(dropped, "\\n"))
+end
+return dropped
+"""
+
+
+# returned by a patch to delete the value (or hash field) it was given
+DROP = object()
+PATCH_RETRIES = 3
+
+
+def tag_key(tag: str) -> str:
+    return f"tag_{tag}"
+
+
+def jitter(ex: int) -> int:
+    # spread expiries so keys written together don't all expire together
+    spread = ex * settings.REDIS_CACHE_TTL_JITTER
+    return max(1, round(ex + random.uniform(-spread, spread)))
+
+
+class RedisClient:
+    def __init__(self):
+        self.codec = cache_codec
+        super().__init__()
+
+    @property
+    def client(self) -> Redis:
+        if redis_pool.client is None:
+            raise RuntimeError("Redis pool is not open")
+        return redis_pool.client
+
+    def pipeline(self, transaction: bool = True):
+        # batches commands into one round trip, wrapped in MULTI/EXEC
+        # unless transaction is False
+        return self.client.pipeline(transaction=transaction)
+
+    async def get_redis(self, key: str):
+        value = await self.client.get(key)
+        return self.codec.decode(value)
 
-    async def get_redis(self, key: str) -> str:
+    async def get_redis_raw(self, key: str) -> tuple[bytes, str] | None:
+        # cached value as a ready-made JSON body and its ETag
         value = await self.client.get(key)
-        if value:
-            return pickle.loads(value)
-    
-    async def set_redis(self, key: str, value) -> None:
-        pickled_value = pickle.dumps(value)
-        await self.client.set(key, pickled_value)
-    
-    async def delete(self, key: str) -> None:
-        await self.client.set(key, "")
-        # neither delete or expire works
-        await self.client.delete(key)
-
-    async def scan(self, match: str):
-        matched_keys = await self.client.scan(match)
-        return matched_keys
-    
-    async def close_redis(self) -> None:
-        await self.client.close()
\ No newline at end of file
+        return self.codec.render_tagged(value)
+
+    async def get_redis_raw_ttl(self, key: str, field: str | None = None) -> tuple:
+        # cached JSON body and ETag, and the key's remaining TTL in ms, in one
+        # round trip
+        async with self.pipeline(transaction=False) as pipe:
+            if field is None:
+                pipe.get(key)
+            else:
+                pipe.hget(key, field)
+            pipe.pttl(key)
+            value, ttl = await pipe.execute()
+        return self.codec.render_tagged(value), ttl
+
+    async def mget_redis(self, *keys: str) -> list:
+        values = await self.client.mget(keys)
+        return [self.codec.decode(value) for value in values]
+
+    async def mget_redis_raw(self, *keys: str) -> list:
+        values = await self.client.mget(keys)
+        return [self.codec.render_tagged(value) for value in values]
+
+    async def set_redis(self, key: str, value, ex: int | None = None, tags: list = ()) -> bytes:
+        # returns what was stored, so callers can answer from it directly
+        data = self.codec.encode(value)
+        ex = jitter(ex) if ex else None
+        async with self.pipeline() as pipe:
+            self.tag(pipe, key, tags, ex)
+            pipe.set(key, data, ex=ex)
+            await pipe.execute()
+        return data
+
+    async def hget_redis_raw(self, key: str, field: str) -> tuple[bytes, str] | None:
+        value = await self.client.hget(key, field)
+        return self.codec.render_tagged(value)
+
+    async def hset_redis(
+            self,
+            key: str,
+            field: str,
+            value,
+            ex: int | None = None,
+            tags: list = (),
+            renew: bool = False,
+            max_fields: int | None = None
+        ) -> bytes:
+        """Caches ``value`` under ``field`` of the hash at ``key``.
+
+        The hash's expiry is set by the write that creates it and isn't
+        pushed back by later fields, so no field outlives ``ex``; ``renew``
+        starts the hash over with just this field and a fresh expiry (a
+        stale-window refresh). Past ``max_fields`` the field is taken back
+        out again.
+        """
+        data = self.codec.encode(value)
+        ex = jitter(ex) if ex else None
+        async with self.pipeline() as pipe:
+            if renew:
+                pipe.unlink(key)
+            self.tag(pipe, key, tags, ex)
+            pipe.hset(key, field, data)
+            if ex:
+                pipe.expire(key, ex, nx=True)
+            pipe.hlen(key)
+            *_, fields = await pipe.execute()
+        if max_fields and fields > max_fields:
+            await self.client.hdel(key, field)
+        return data
+
+    @staticmethod
+    def tag(pipe, key: str, tags: list, ex: int | None = None) -> None:
+        # registered in the same MULTI as the write, so an invalidation
+        # can't slip in between and miss the key. A tag set expires with
+        # its longest-lived member (NX for a new set, GT to push an existing
+        # one back), so sets of keys that expired on their own don't pile up
+        for tag in tags:
+            pipe.sadd(tag_key(tag), key)
+            if ex:
+                pipe.expire(tag_key(tag), ex, nx=True)
+                pipe.expire(tag_key(tag), ex, gt=True)
+
+    async def invalidate(self, tags: list = (), keys: list = ()) -> list:
+        # returns the keys that were dropped, tag sets not included
+        if not tags and not keys:
+            return []
+        script = self.client.register_script(INVALIDATE)
+        return await script(
+            keys=[tag_key(tag) for tag in tags] + list(keys),
+            args=[len(tags), settings.LOCAL_CACHE_CHANNEL]
+        )
+
+    async def patch_redis(self, key: str, patch) -> bool:
+        """Rewrites a cached value in place with ``patch(value)``.
+
+        ``value`` is the JSON-compatible form; patch returns the new value,
+        DROP, or None to leave it. The key is WATCHed, so a concurrent write
+        makes us re-read and patch again rather than overwrite it. Returns
+        False if that kept happening, and the caller should drop the key.
+        """
+        for _ in range(PATCH_RETRIES):
+            try:
+                async with self.client.pipeline() as pipe:
+                    await pipe.watch(key)
+                    value = self.codec.decode(await pipe.get(key))
+                    patched = DROP if value is None else patch(to_primitive(value))
+                    pipe.multi()
+                    if patched is DROP:
+                        pipe.unlink(key)
+                    elif patched is not None:
+                        pipe.set(key, self.codec.encode(patched), keepttl=True)
+                    pipe.publish(settings.LOCAL_CACHE_CHANNEL, key)
+                    await pipe.execute()
+                return True
+            except WatchError:
+                continue
+        return False
+
+    async def patch_redis_hash(self, key: str, patch) -> bool:
+        # patch_redis for hashes, patch(field, value) is called per field
+        for _ in range(PATCH_RETRIES):
+            try:
+                async with self.client.pipeline() as pipe:
+                    await pipe.watch(key)
+                    fields = await pipe.hgetall(key)
+                    changed, dropped = {}, []
+                    for field, data in fields.items():
+                        value = self.codec.decode(data)
+                        patched = DROP if value is None else patch(field.decode(), to_primitive(value))
+                        if patched is DROP:
+                            dropped.append(field)
+                        elif patched is not None:
+                            changed[field] = self.codec.encode(patched)
+                    pipe.multi()
+                    if changed:
+                        pipe.hset(key, mapping=changed)
+                    if dropped:
+                        pipe.hdel(key, *dropped)
+                    pipe.publish(settings.LOCAL_CACHE_CHANNEL, key)
+                    await pipe.execute()
+                return True
+            except WatchError:
+                continue
+        return False
+
+    def lock(self, name: str) -> Lock:
+        return self.client.lock(
+            f"lock_{name}",
+            timeout=settings.REDIS_CACHE_LOCK_TTL,
+            blocking=False,
+            thread_local=False
+        )
@@ -3,10 +3,23 @@ from app.db.mongodb import lifespan
 from dotenv import load_dotenv
 import fastapi_problem.handler
 from .api import router
+from .api.metrics import router as metrics_router
+from .utils.conditional import ConditionalGetMiddleware
+from .utils.metrics import MetricsMiddleware
+from .security.rate_limit import RateLimitHeadersMiddleware
+from .security.config import settings
 
 load_dotenv()
 app = FastAPI(lifespan=lifespan)
 fastapi_problem.handler.add_exception_handler(app)
+app.add_middleware(ConditionalGetMiddleware)
+if settings.RATE_LIMIT_ENABLED:
+    # outside ConditionalGetMiddleware, so 304s carry the headers too
+    app.add_middleware(RateLimitHeadersMiddleware)
+if settings.METRICS_ENABLED:
+    # outermost, so the time includes every other middleware
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics_router)
 
 
 app.include_router(router)
\ No newline at end of file
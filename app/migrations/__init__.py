@@ -0,0 +1,35 @@
+"""One-off data migrations, run from the repo root (or /code in the image)
+before deploying the change that needs them, e.g.
+
+    python -m app.migrations.avatars --dry-run
+
+Each one is safe to run again, documents already migrated are skipped.
+"""
+from contextlib import asynccontextmanager
+import certifi
+from beanie import init_beanie
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.db.avatars import avatar_storage
+from app.db.mongodb import DOCUMENT_MODELS
+from app.db.redis import RedisClient, redis_pool
+from app.security.config import settings
+
+
+@asynccontextmanager
+async def connect():
+    # what the lifespan opens, minus the near cache and metrics; indexes are
+    # left to the app, building one can fail on the data being migrated
+    client = AsyncIOMotorClient(settings.MONGO_URI, tlsCAFile=certifi.where())
+    await init_beanie(database=client.ficrec, document_models=DOCUMENT_MODELS, skip_indexes=True)
+    avatar_storage.open(client.ficrec)
+    await redis_pool.open()
+    try:
+        yield client.ficrec
+    finally:
+        await redis_pool.close()
+        client.close()
+
+
+async def invalidate(*tags: str) -> None:
+    # cached responses built from the old documents
+    await RedisClient().invalidate(list(tags))
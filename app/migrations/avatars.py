@@ -0,0 +1,64 @@
+"""Moves avatars stored as base64 in the user document into avatar storage.
+
+For each user with a legacy ``avatar`` field, renders it through
+``avatar_storage.save`` like an upload, sets ``avatar_version`` and unsets
+``avatar``. Users who already uploaded a new avatar just lose the old field.
+Values that don't decode to an image are reported and left in place.
+
+    python -m app.migrations.avatars [--dry-run]
+"""
+import argparse
+import asyncio
+import base64
+import binascii
+from app.db.avatars import avatar_storage, render_thumbnails
+from app.migrations import connect, invalidate
+
+
+def decode_avatar(value: str) -> bytes:
+    # data: URLs carry the base64 after the comma
+    if value.startswith("data:"):
+        value = value.partition(",")[2]
+    try:
+        return base64.b64decode(value)
+    except binascii.Error:
+        raise ValueError("not base64")
+
+
+async def migrate(dry_run: bool) -> None:
+    moved = cleared = failed = 0
+    async with connect() as database:
+        users = database.users
+        async for user in users.find({"avatar": {"$exists": True}}, {"avatar": 1, "avatar_version": 1}):
+            user_id = str(user["_id"])
+            value = user["avatar"]
+
+            update = {"$unset": {"avatar": ""}}
+            if value and not user.get("avatar_version"):
+                try:
+                    data = decode_avatar(value)
+                    if dry_run:
+                        await asyncio.to_thread(render_thumbnails, data)
+                    else:
+                        update["$set"] = {"avatar_version": await avatar_storage.save(user_id, data)}
+                except ValueError as error:
+                    print(f"{user_id}: {error}, left as is")
+                    failed += 1
+                    continue
+                moved += 1
+            else:
+                cleared += 1
+
+            if not dry_run:
+                # only if nobody changed it meanwhile
+                await users.update_one({"_id": user["_id"], "avatar": value}, update)
+                await invalidate(f"profile_{user_id}")
+
+    prefix = "would have " if dry_run else ""
+    print(f"{prefix}moved {moved} avatars, {prefix}cleared {cleared} empty or replaced ones, {failed} failed")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dry-run", action="store_true", help="decode and count, write nothing")
+    asyncio.run(migrate(parser.parse_args().dry_run))
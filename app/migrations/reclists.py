@@ -0,0 +1,58 @@
+"""Moves collections out of the ``recs`` collection into ``reclists``.
+
+RecList used to share ``recs`` with Rec. Collections are the documents
+there with a ``user`` link and no ``reclist`` link. Each batch is inserted
+into ``reclists`` (keeping its _id) and only then deleted from ``recs``, so
+an interrupted run can simply be run again. The owners' cached responses
+are dropped.
+
+    python -m app.migrations.reclists [--dry-run] [--batch-size 500]
+"""
+import argparse
+import asyncio
+from pymongo.errors import BulkWriteError
+from app.migrations import connect, invalidate
+
+LEGACY_RECLISTS = {"user": {"$exists": True}, "reclist": {"$exists": False}}
+
+
+DUPLICATE_KEY = 11000
+
+
+async def move(database, batch: list) -> None:
+    try:
+        await database.reclists.insert_many(batch, ordered=False)
+    except BulkWriteError as error:
+        # copied by an earlier, interrupted run
+        if any(write["code"] != DUPLICATE_KEY for write in error.details["writeErrors"]):
+            raise
+    await database.recs.delete_many({"_id": {"$in": [document["_id"] for document in batch]}})
+    await invalidate(*{f"user_{document['user'].id}" for document in batch})
+
+
+async def migrate(dry_run: bool, batch_size: int) -> None:
+    moved = 0
+    async with connect() as database:
+        if dry_run:
+            moved = await database.recs.count_documents(LEGACY_RECLISTS)
+        else:
+            batch = []
+            async for document in database.recs.find(LEGACY_RECLISTS):
+                batch.append(document)
+                if len(batch) == batch_size:
+                    await move(database, batch)
+                    moved += len(batch)
+                    batch = []
+            if batch:
+                await move(database, batch)
+                moved += len(batch)
+
+    print(f"{'would have ' if dry_run else ''}moved {moved} collections from recs to reclists")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dry-run", action="store_true", help="count, write nothing")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(migrate(args.dry_run, args.batch_size))
@@ -0,0 +1,28 @@
+"""Lists usernames held by more than one user.
+
+The username_unique index on users (built by init_beanie at startup)
+can't be created while duplicates exist, and the app then logs it as
+missing while signup and renames race unchecked. Rename all but one
+holder of each name before deploying; this only reports them.
+
+    python -m app.migrations.usernames
+"""
+import asyncio
+from app.migrations import connect
+
+
+async def report() -> None:
+    async with connect() as database:
+        duplicates = await database.users.aggregate([
+            {"$group": {"_id": "$username", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+            {"$match": {"count": {"$gt": 1}}},
+            {"$sort": {"_id": 1}}
+        ]).to_list(None)
+
+    for duplicate in duplicates:
+        print(f"{duplicate['_id']}: {', '.join(str(user_id) for user_id in duplicate['ids'])}")
+    print(f"{len(duplicates)} usernames held by more than one user")
+
+
+if __name__ == "__main__":
+    asyncio.run(report())
@@ -1,3 +1,4 @@
-from .user import SignUpForm, User, UserProfileForm, UsernameForm, PasswordForm
+from .user import SignUpForm, User, UserRef, UserProfileForm, UsernameForm, PasswordForm
 from .reclist import RecListConfig, RecList, RecListForm
-from .rec import Rec
\ No newline at end of file
+from .rec import Rec, RecCard, RecForm, RecSearch
+from .profile_page import ProfilePage
\ No newline at end of file
@@ -0,0 +1,72 @@
+from beanie import PydanticObjectId
+from app.db.codecs import to_primitive
+from app.security.config import settings
+from app.utils.pagination import encode_cursor
+from .user import User
+from .reclist import RecList
+from .rec import Rec, RecCard
+
+
+def first_page(items: list, limit: int, to_item) -> dict:
+    # fetched with one extra to tell whether there is a next page, the
+    # cursor carries on with the regular list endpoints
+    next_cursor = encode_cursor(items[limit - 1]["_id"]) if len(items) > limit else None
+    return {"items": [to_item(item) for item in items[:limit]], "next_cursor": next_cursor}
+
+
+class ProfilePage:
+    """A public profile, its public collections and the first page of recs
+    in each, read in one aggregation and cached as one value."""
+
+    @classmethod
+    def pipeline(cls, user_id: str, collections: int, recs: int) -> list:
+        card_fields = {field.alias or name: 1 for name, field in RecCard.model_fields.items()}
+        return [
+            {"$match": {"_id": PydanticObjectId(user_id), "is_active": True}},
+            {"$lookup": {
+                "from": RecList.Settings.name,
+                "localField": "_id",
+                "foreignField": "user.$id",
+                "pipeline": [
+                    {"$match": {"deleted": False, "private": False}},
+                    {"$sort": {"_id": 1}},
+                    {"$limit": collections + 1},
+                    {"$lookup": {
+                        "from": Rec.Settings.name,
+                        "localField": "_id",
+                        "foreignField": "reclist.$id",
+                        "pipeline": [
+                            {"$match": {"deleted": False}},
+                            {"$sort": {"_id": 1}},
+                            {"$limit": recs + 1},
+                            {"$project": card_fields},
+                        ],
+                        "as": "recs"
+                    }},
+                ],
+                "as": "collections"
+            }},
+        ]
+
+    @classmethod
+    async def query_item(cls, user_id: str, public: bool = True) -> dict | None:
+        collections = settings.PROFILE_PAGE_COLLECTIONS
+        recs = settings.PROFILE_PAGE_RECS
+        documents = await User.aggregate(cls.pipeline(user_id, collections, recs)).to_list()
+        if not documents:
+            return None
+        document = documents[0]
+
+        def collection(reclist: dict) -> dict:
+            items = reclist.pop("recs")
+            reclist = RecList.model_validate(reclist)
+            card = RecCard.for_config(reclist.config)
+            return {
+                **to_primitive(reclist),
+                "recs": first_page(items, recs, lambda rec: to_primitive(card.from_document(rec)))
+            }
+
+        return {
+            "collections": first_page(document.pop("collections"), collections, collection),
+            "profile": to_primitive(User.model_validate(document))
+        }
@@ -1,14 +1,70 @@
-from pydantic import Field, HttpUrl, field_validator
-from beanie import Document, Link
+from pydantic import BaseModel, ConfigDict, Field, HttpUrl
+from beanie import Document, Link, PydanticObjectId
+from beanie.odm.queries.find import FindMany
+from pymongo import ASCENDING, TEXT, IndexModel
 from datetime import datetime
-from typing import List
-import nh3
+from typing import List, Union
+from functools import lru_cache
 from .user import User
-from .reclist import RecList
+from .reclist import RecList, RecListConfig, RecListRef
+from .sanitize import Sanitized
+from app.security.config import settings
 
-class Rec(Document):
-    user: Link[User] = Field(..., frozen=True)
-    reclist: Link[RecList] = Field(..., frozen=True)
+# facets matched with $in, the list ones are multikey
+LIST_FACETS = ("fandom", "ship", "tags")
+SEARCH_FACETS = LIST_FACETS + ("rating", "language")
+# lower bounds of the word count buckets, the last one is open ended
+WORD_BUCKETS = [0, 1000, 5000, 10000, 50000, 100000]
+
+
+class RecSearch(BaseModel):
+    """Search query parameters. Values of one facet are ORed, different
+    facets ANDed."""
+    q:          str | None = Field(None, max_length=200)
+    fandom:     List[str] = []
+    ship:       List[str] = []
+    tags:       List[str] = []
+    rating:     List[str] = []
+    language:   List[str] = []
+    words_min:  int | None = Field(None, ge=0)
+    words_max:  int | None = Field(None, ge=0)
+    limit:      int = Field(settings.PAGE_SIZE, ge=1, le=settings.PAGE_SIZE_MAX)
+    offset:     int = Field(0, ge=0, le=settings.SEARCH_MAX_OFFSET)
+
+    def match(self) -> dict:
+        match = {}
+        if self.q:
+            match["$text"] = {"$search": self.q}
+        for name in SEARCH_FACETS:
+            values = getattr(self, name)
+            if values:
+                match[name] = {"$in": values}
+        words = {}
+        if self.words_min is not None:
+            words["$gte"] = self.words_min
+        if self.words_max is not None:
+            words["$lte"] = self.words_max
+        if words:
+            match["words"] = words
+        return match
+
+
+class RecSearchHit(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    id:         PydanticObjectId = Field(alias="_id")
+    reclist:    PydanticObjectId
+    title:      str
+    author:     str
+    words:      int
+    rating:     str
+    language:   str
+    url:        HttpUrl
+    score:      float | None = None
+
+
+class RecForm(Sanitized):
+    """What a client sends to create a rec, the server sets the rest."""
     title: str
     author: str
     summary: str | None = None
@@ -21,81 +77,177 @@ class Rec(Document):
     tags: List[str] = []
     language: str
     chapters: str
-    created: str = Field(datetime.today().strftime("%d-%m-%Y"), exclude=True, frozen=True)
     url: HttpUrl
+
+
+class Rec(Document, RecForm):
+    user: Link[User] = Field(..., frozen=True)
+    reclist: Link[RecList] = Field(..., frozen=True)
+    created: str = Field(datetime.today().strftime("%d-%m-%Y"), exclude=True, frozen=True)
     deleted: bool = Field(False, exclude=True)
 
     class Settings:
         name = "recs"
+        # _id stands in for creation order, `created` is a d-m-Y string
+        indexes = [
+            IndexModel(
+                [("reclist.$id", ASCENDING), ("deleted", ASCENDING), ("_id", ASCENDING)],
+                name="reclist_deleted_id"
+            ),
+            IndexModel(
+                [("title", TEXT), ("author", TEXT), ("summary", TEXT)],
+                weights={"title": 10, "author": 5, "summary": 1},
+                default_language="none",
+                name="title_author_summary_text"
+            ),
+            *(
+                IndexModel(
+                    [("reclist.$id", ASCENDING), ("deleted", ASCENDING), (facet, ASCENDING)],
+                    name=f"reclist_deleted_{facet}"
+                )
+                for facet in LIST_FACETS
+            ),
+        ]
         
     @classmethod
-    async def query(cls, reclist_id: str, query_list: bool, public: bool = False) -> list:
-        return await Rec.find(Rec.reclist_id == reclist_id, Rec.deleted == False).to_list()
-    
-    @field_validator('title')
-    @classmethod
-    def validate_title(cls, value: str) -> str:
-        return nh3.clean(value)
-    
-    @field_validator('summary')
-    @classmethod
-    def validate_summary(cls, value: str) -> str:
-        if value:
-            value = nh3.clean(value)
-        return value
-    
-    @field_validator('notes')
-    @classmethod
-    def validate_note(cls, value: str) -> str:
-        if value:
-            value = nh3.clean(value)
-        return value
-    
-    @field_validator('words')
-    @classmethod
-    def validate_words(cls, value: str) -> str:
-        return nh3.clean(value)
-    
-    @field_validator('warnings')
-    @classmethod
-    def validate_warnings(cls, value: str) -> str:
-        return nh3.clean(value)
-    
-    @field_validator('rating')
+    def query_cursor(
+            cls,
+            reclist_id: str,
+            public: bool = False,
+            after: PydanticObjectId | None = None,
+            projection: type[BaseModel] | None = None
+        ) -> FindMany:
+        filters = [cls.reclist.id == PydanticObjectId(reclist_id), cls.deleted == False]
+        if after:
+            filters.append(cls.id > after)
+        return cls.find(*filters).sort("_id").project(projection)
+
     @classmethod
-    def validate_rating(cls, value: str) -> str:
-        return nh3.clean(value)
-    
-    @field_validator('language')
+    async def query(
+            cls,
+            reclist_id: str,
+            public: bool = False,
+            limit: int | None = None,
+            after: PydanticObjectId | None = None,
+            projection: type[BaseModel] | None = None
+        ) -> list:
+        return await cls.query_cursor(reclist_id, public, after, projection).limit(limit).to_list()
+
     @classmethod
-    def validate_language(cls, value: str) -> str:
-        return nh3.clean(value)
-    
-    @field_validator('chapters')
+    async def query_item(cls, rec_id: str, public: bool = False) -> Union[object, None]:
+        try:
+            rec = await cls.get(rec_id)
+        except:
+            return None
+        if not rec or rec.deleted:
+            return None
+        return rec
+
     @classmethod
-    def validate_chapters(cls, value: str) -> str:
-        return nh3.clean(value)
-    
-    @field_validator('fandom')
+    async def search(cls, user_id: str, search: RecSearch, public: bool = False) -> dict:
+        # deleting a collection leaves its recs be, so scope by live ones
+        reclists = await RecList.query(user_id, public, projection=RecListRef)
+        match = {
+            "reclist.$id": {"$in": [reclist.id for reclist in reclists]},
+            "deleted": False,
+            **search.match()
+        }
+        pipeline = [{"$match": match}]
+        sort = {"_id": 1}
+        if search.q:
+            pipeline.append({"$addFields": {"score": {"$meta": "textScore"}}})
+            sort = {"score": -1, "_id": 1}
+
+        facets = {
+            name: [{"$unwind": f"${name}"}] if name in LIST_FACETS else []
+            for name in SEARCH_FACETS
+        }
+        for name, stages in facets.items():
+            stages += [
+                {"$group": {"_id": f"${name}", "count": {"$sum": 1}}},
+                {"$sort": {"count": -1, "_id": 1}},
+                {"$limit": settings.SEARCH_FACET_LIMIT}
+            ]
+        pipeline.append({"$facet": {
+            "items": [
+                {"$sort": sort},
+                {"$skip": search.offset},
+                {"$limit": search.limit},
+                {"$project": {name: 1 for name in RecSearchHit.model_fields if name != "id"}}
+            ],
+            "total": [{"$count": "count"}],
+            "words": [{"$bucket": {
+                "groupBy": "$words",
+                "boundaries": WORD_BUCKETS,
+                "default": WORD_BUCKETS[-1]
+            }}],
+            **facets
+        }})
+
+        [result] = await cls.aggregate(pipeline).to_list()
+        upper = dict(zip(WORD_BUCKETS, WORD_BUCKETS[1:]))
+        return {
+            "items": [
+                RecSearchHit.model_validate({**hit, "reclist": hit["reclist"].id})
+                for hit in result["items"]
+            ],
+            "total": result["total"][0]["count"] if result["total"] else 0,
+            "facets": {
+                **{
+                    name: [{"value": bucket["_id"], "count": bucket["count"]} for bucket in result[name]]
+                    for name in SEARCH_FACETS
+                },
+                "words": [
+                    {"min": bucket["_id"], "max": upper.get(bucket["_id"]), "count": bucket["count"]}
+                    for bucket in result["words"]
+                ]
+            }
+        }
+
+
+REC_CARD_FIELDS = ("_id", "title", "author", "words", "rating", "language", "url")
+
+class RecCard(BaseModel):
+    """What a rec list shows: no summary or notes, and only the optional
+    fields switched on in the collection's RecListConfig."""
+    model_config = ConfigDict(populate_by_name=True)
+
+    id:         PydanticObjectId = Field(alias="_id")
+    title:      str
+    author:     str
+    words:      int
+    rating:     str
+    language:   str
+    url:        HttpUrl
+    fandom:     List[str] | None = None
+    ship:       List[str] | None = None
+    warnings:   str | None = None
+    tags:       List[str] | None = None
+    chapters:   str | None = None
+
     @classmethod
-    def validate_fandom(cls, value: list) -> list:
-        new_value = []
-        for tag in value:
-            new_value.append(nh3.clean(tag))
-        return new_value
-    
-    @field_validator('ship')
+    def for_config(cls, config: RecListConfig) -> type["RecCard"]:
+        return _rec_card(**config.model_dump())
+
     @classmethod
-    def validate_ship(cls, value: list) -> list:
-        new_value = []
-        for tag in value:
-            new_value.append(nh3.clean(tag))
-        return new_value
-    
-    @field_validator('tags')
+    def from_rec(cls, rec: Rec) -> "RecCard":
+        return cls.from_document(rec.model_dump(by_alias=True))
+
     @classmethod
-    def validate_tags(cls, value: list) -> list:
-        new_value = []
-        for tag in value:
-            new_value.append(nh3.clean(tag))
-        return new_value
+    def from_document(cls, document: dict) -> "RecCard":
+        # only what the projected query would have filled in, on a class
+        # from for_config
+        return cls.model_validate({name: document.get(name) for name in cls.Settings.projection})
+
+
+@lru_cache
+def _rec_card(**toggles: bool) -> type[RecCard]:
+    projection = {name: 1 for name in REC_CARD_FIELDS}
+    projection.update({name: 1 for name, shown in toggles.items() if shown})
+
+    class ConfiguredRecCard(RecCard):
+        class Settings:
+            pass
+
+    ConfiguredRecCard.Settings.projection = projection
+    return ConfiguredRecCard
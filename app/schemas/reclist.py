@@ -1,14 +1,21 @@
-from pydantic import BaseModel, Field, field_validator
-from beanie import Document, Link
+from pydantic import BaseModel, ConfigDict, Field
+from beanie import Document, Link, PydanticObjectId
+from pymongo import ASCENDING, IndexModel
 from datetime import datetime
-import nh3
 from typing import Union
 from .user import User
+from .sanitize import Sanitized
 
-class RecListForm(BaseModel):
+class RecListForm(Sanitized):
     name:       str = None
     about:      str = None
 
+class RecListRef(BaseModel):
+    """Just the id, to scope queries over a user's collections."""
+    model_config = ConfigDict(populate_by_name=True)
+
+    id:         PydanticObjectId = Field(alias="_id")
+
 class RecListConfig(BaseModel):
     fandom:     bool = False
     ship:       bool = False
@@ -16,7 +23,7 @@ class RecListConfig(BaseModel):
     tags:       bool = False
     chapters:   bool = False    
 
-class RecList(Document):
+class RecList(Document, Sanitized):
     user:       Link[User] = Field(..., frozen=True)
     name:       str
     about:      str | None = None
@@ -26,26 +33,29 @@ class RecList(Document):
     deleted:    bool = Field(False, exclude=True)
 
     class Settings:
-        name = "recs"
-
-    @field_validator('name')
-    @classmethod
-    def validate_name(cls, value: str) -> str:
-        return nh3.clean(value)
-    
-    @field_validator('about')
-    @classmethod
-    def validate_about(cls, value: str) -> str:
-        if value:
-            value = nh3.clean(value)
-        return value
+        name = "reclists"
+        indexes = [
+            IndexModel(
+                [("user.$id", ASCENDING), ("deleted", ASCENDING), ("private", ASCENDING)],
+                name="user_deleted_private"
+            ),
+        ]
 
     @classmethod
-    async def query(cls, user_id: str, public: bool = False) -> list:
-        if not public:
-            return await cls.find(cls.user_id == user_id, cls.deleted == False).to_list()
+    async def query(
+            cls,
+            user_id: str,
+            public: bool = False,
+            limit: int | None = None,
+            after: PydanticObjectId | None = None,
+            projection: type[BaseModel] | None = None
+        ) -> list:
+        filters = [cls.user.id == PydanticObjectId(user_id), cls.deleted == False]
         if public:
-            return await cls.find(cls.user_id == user_id, cls.private == False, cls.deleted == False).to_list()
+            filters.append(cls.private == False)
+        if after:
+            filters.append(cls.id > after)
+        return await cls.find(*filters).sort("_id").limit(limit).project(projection).to_list()
     
     @classmethod
     async def query_item(cls, reclist_id: str, public: bool = False) -> Union[object, None]:
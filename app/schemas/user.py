@@ -1,9 +1,10 @@
-from pydantic import BaseModel, Field, SecretStr, field_validator
-from beanie import Document
-from pydantic.types import Base64Str
-import nh3
+from pydantic import BaseModel, ConfigDict, Field, SecretStr, computed_field, field_validator
+from beanie import Document, PydanticObjectId
+from pymongo import ASCENDING, IndexModel
 import re
-from app.security.crypt_context import PW_CONTEXT
+from app.security.crypt_context import password_hasher
+from app.db.avatars import AVATAR_SIZES
+from .sanitize import Sanitized, clean
 from typing import Union
 
     
@@ -12,22 +13,26 @@ class PasswordForm(BaseModel):
     match_password: str = Field(..., min_length=6)
 
     @classmethod
-    def hash_password(cls, password: str) -> str:
-        return PW_CONTEXT.hash(password)
+    async def hash_password(cls, password: str) -> str:
+        return await password_hasher.hash(password)
 
     @field_validator('password')
     @classmethod
     def validate_password(cls, password: str) -> str:
-        value = nh3.clean(password)
+        value = clean(password)
         return value
 
+# /v1 paths that come before /v1/{username}, a user by one of these names
+# would never get a public page
+RESERVED_USERNAMES = frozenset({"auth", "profile", "avatars"})
+
 class UsernameForm(BaseModel):
     username: str = Field(..., min_length=4)
 
     @field_validator('username')
     @classmethod
     def validate_username(cls, username: str) -> str:
-        value = nh3.clean(username)
+        value = clean(username)
 
         if value[0].isnumeric():
             raise ValueError("username must not start with a number")
@@ -38,29 +43,52 @@ class UsernameForm(BaseModel):
         regex = "^[a-z][a-z0-9*_-]+$"
         if not re.search(regex, value):
             raise ValueError("invalid username")
+
+        if value.lower() in RESERVED_USERNAMES:
+            raise ValueError("username is reserved")
     
         return value.lower()
 
 class SignUpForm(UsernameForm, PasswordForm):
     pass
 
-class UserProfileForm(BaseModel):
+class UserProfileForm(Sanitized):
     bio: str = None
-    avatar: Base64Str = None
     highlight: str | None = None
 
+class UserRef(BaseModel):
+    """Just enough of a User to resolve a public username or serve its avatar."""
+    model_config = ConfigDict(populate_by_name=True)
+
+    id: PydanticObjectId = Field(alias="_id")
+    is_active: bool = True
+    avatar_version: str | None = None
+
 class User(Document):
     username: str
     password: SecretStr = Field(..., exclude=True)
     bio: str | None = None
-    avatar: Base64Str | None = None
+    avatar_version: str | None = Field(None, exclude=True)
     is_active: bool = Field(True)
 
     class Settings:
         name = "users"
+        indexes = [
+            IndexModel([("username", ASCENDING)], name="username_unique", unique=True),
+        ]
         
+    @computed_field
+    @property
+    def avatar_urls(self) -> dict | None:
+        if not self.avatar_version:
+            return None
+        return {
+            size: f"/v1/avatars/{self.id}/{size}?v={self.avatar_version}"
+            for size in AVATAR_SIZES
+        }
+
     @classmethod
-    async def query_item(cls, user_id: str) -> Union[object, None]:
+    async def query_item(cls, user_id: str, public: bool = False) -> Union[object, None]:
         user = await User.get(user_id)
         if user.is_active:
             return user
@@ -68,9 +96,9 @@ class User(Document):
             return None
 
     @classmethod
-    async def find_by_username(cls, username: str) -> object:
-        user = await User.find_one(User.username == username)
+    async def find_by_username(cls, username: str, projection: type[BaseModel] | None = None) -> object:
+        user = await User.find_one(User.username == username, projection_model=projection)
         return user
         
-    def verify_password(self, password: str) -> bool:
-        return PW_CONTEXT.verify(password, self.password.get_secret_value())
\ No newline at end of file
+    async def verify_password(self, password: str) -> bool:
+        return await password_hasher.verify(password, self.password.get_secret_value())
\ No newline at end of file
@@ -17,10 +17,17 @@ class CryptSettings(BaseSettings):
     SECRET_KEY: str = config("SECRET_KEY")
     ALGORITHM: str = config("ALGORITHM")
     ACCESS_TOKEN_EXPIRE: int = config("ACCESS_TOKEN_EXPIRE", default=1)
+    JWT_BACKEND: str = config("JWT_BACKEND", default="pyjwt")
+    TOKEN_CACHE_SIZE: int = config("TOKEN_CACHE_SIZE", default=10000)
+    TOKEN_CACHE_TTL: int = config("TOKEN_CACHE_TTL", default=300)
+    PASSWORD_HASH_WORKERS: int = config("PASSWORD_HASH_WORKERS", default=4)
+    PASSWORD_HASH_QUEUE_LIMIT: int = config("PASSWORD_HASH_QUEUE_LIMIT", default=64)
 
 
 class MongoDBSettings(BaseSettings):
     MONGO_URI: str = config("MONGO_URI")
+    # per worker process, like REDIS_CACHE_MAX_CONNECTIONS
+    MONGO_MAX_POOL_SIZE: int = config("MONGO_MAX_POOL_SIZE", default=100)
 
 
 class RedisCacheSettings(BaseSettings):
@@ -28,17 +35,109 @@ class RedisCacheSettings(BaseSettings):
     REDIS_CACHE_PORT: int = config("REDIS_CACHE_PORT")
     REDIS_CACHE_USERNAME: str = config("REDIS_CACHE_USERNAME")
     REDIS_CACHE_PASSWORD: str = config("REDIS_CACHE_PASSWORD")
+    REDIS_CACHE_MAX_CONNECTIONS: int = config("REDIS_CACHE_MAX_CONNECTIONS", default=50)
+    REDIS_CACHE_POOL_TIMEOUT: int = config("REDIS_CACHE_POOL_TIMEOUT", default=5)
+    REDIS_CACHE_HEALTH_CHECK_INTERVAL: int = config("REDIS_CACHE_HEALTH_CHECK_INTERVAL", default=30)
+    REDIS_CACHE_CODEC: str = config("REDIS_CACHE_CODEC", default="orjson")
+    REDIS_CACHE_SCHEMA_VERSION: int = config("REDIS_CACHE_SCHEMA_VERSION", default=3)
+    REDIS_CACHE_TTL: int = config("REDIS_CACHE_TTL", default=3600)
+    REDIS_CACHE_TTL_JITTER: float = config("REDIS_CACHE_TTL_JITTER", default=0.1)
+    REDIS_CACHE_STALE_TTL: int = config("REDIS_CACHE_STALE_TTL", default=60)
+    REDIS_CACHE_LOCK_TTL: int = config("REDIS_CACHE_LOCK_TTL", default=5)
+    REDIS_CACHE_WRITE_THROUGH: bool = config("REDIS_CACHE_WRITE_THROUGH", default=True)
 
 
-# class RedisRateLimiterSettings(BaseSettings):
-#     REDIS_RATE_LIMIT_HOST: str = config("REDIS_RATE_LIMIT_HOST", default="localhost")
-#     REDIS_RATE_LIMIT_PORT: int = config("REDIS_RATE_LIMIT_PORT", default=6379)
-#     REDIS_RATE_LIMIT_URL: str = f"redis://{REDIS_RATE_LIMIT_HOST}:{REDIS_RATE_LIMIT_PORT}"
+class LocalCacheSettings(BaseSettings):
+    LOCAL_CACHE_SIZE: int = config("LOCAL_CACHE_SIZE", default=2000)
+    LOCAL_CACHE_TTL: int = config("LOCAL_CACHE_TTL", default=5)
+    LOCAL_CACHE_CHANNEL: str = config("LOCAL_CACHE_CHANNEL", default="cache_invalidation")
+
+
+class HttpCacheSettings(BaseSettings):
+    # anything a CDN may keep for s-maxage stays visible that long after a
+    # collection is made private, so keep it short
+    PUBLIC_CACHE_CONTROL: str = config("PUBLIC_CACHE_CONTROL", default="public, max-age=0, s-maxage=30")
+    PRIVATE_CACHE_CONTROL: str = config("PRIVATE_CACHE_CONTROL", default="private, no-cache")
+
+
+class UsernameCacheSettings(BaseSettings):
+    USERNAME_CACHE_SIZE: int = config("USERNAME_CACHE_SIZE", default=10000)
+    USERNAME_CACHE_TTL: int = config("USERNAME_CACHE_TTL", default=30)
+    USERNAME_CACHE_NEGATIVE_TTL: int = config("USERNAME_CACHE_NEGATIVE_TTL", default=60)
+
+
+class ReclistOwnerCacheSettings(BaseSettings):
+    # owners never change, so this only bounds memory
+    RECLIST_OWNER_CACHE_SIZE: int = config("RECLIST_OWNER_CACHE_SIZE", default=10000)
+    RECLIST_OWNER_CACHE_TTL: int = config("RECLIST_OWNER_CACHE_TTL", default=3600)
+
+
+class AvatarSettings(BaseSettings):
+    AVATAR_STORAGE: str = config("AVATAR_STORAGE", default="gridfs")
+    AVATAR_DIR: str = config("AVATAR_DIR", default="avatars")
+    AVATAR_MAX_BYTES: int = config("AVATAR_MAX_BYTES", default=5 * 1024 * 1024)
+
+
+class ImportSettings(BaseSettings):
+    IMPORT_MAX_BYTES: int = config("IMPORT_MAX_BYTES", default=5 * 1024 * 1024)
+    IMPORT_MAX_ITEMS: int = config("IMPORT_MAX_ITEMS", default=2000)
+    IMPORT_BATCH_SIZE: int = config("IMPORT_BATCH_SIZE", default=200)
+
+
+class ServerSettings(BaseSettings):
+    SERVER_HOST: str = config("SERVER_HOST", default="0.0.0.0")
+    SERVER_PORT: int = config("SERVER_PORT", default=8000)
+    # 0 is one worker per available CPU
+    WEB_CONCURRENCY: int = config("WEB_CONCURRENCY", default=0)
+    SERVER_BACKLOG: int = config("SERVER_BACKLOG", default=2048)
+    # above the load balancer's idle timeout, so it never reuses a
+    # connection we're closing
+    SERVER_KEEP_ALIVE: int = config("SERVER_KEEP_ALIVE", default=75)
+    # below the orchestrator's kill grace period
+    SERVER_GRACEFUL_TIMEOUT: int = config("SERVER_GRACEFUL_TIMEOUT", default=25)
+    SERVER_LIMIT_CONCURRENCY: int | None = config("SERVER_LIMIT_CONCURRENCY", default=None)
+    SERVER_ACCESS_LOG: bool = config("SERVER_ACCESS_LOG", default=True)
+    FORWARDED_ALLOW_IPS: str = config("FORWARDED_ALLOW_IPS", default="127.0.0.1")
+
+
+class MetricsSettings(BaseSettings):
+    # off: no timing middleware, listeners or lag probe, and no /metrics
+    METRICS_ENABLED: bool = config("METRICS_ENABLED", default=False)
+    METRICS_LOOP_LAG_INTERVAL: float = config("METRICS_LOOP_LAG_INTERVAL", default=0.5)
+
+
+class SearchSettings(BaseSettings):
+    SEARCH_FACET_LIMIT: int = config("SEARCH_FACET_LIMIT", default=20)
+    SEARCH_MAX_OFFSET: int = config("SEARCH_MAX_OFFSET", default=1000)
+
+
+class SanitizeSettings(BaseSettings):
+    SANITIZE_CACHE_SIZE: int = config("SANITIZE_CACHE_SIZE", default=4096)
+
+
+class PaginationSettings(BaseSettings):
+    PAGE_SIZE: int = config("PAGE_SIZE", default=50)
+    PAGE_SIZE_MAX: int = config("PAGE_SIZE_MAX", default=200)
+    # cached pages (and recs) per list hash, past it pages are served uncached
+    PAGE_CACHE_MAX_FIELDS: int = config("PAGE_CACHE_MAX_FIELDS", default=256)
+    PROFILE_PAGE_COLLECTIONS: int = config("PROFILE_PAGE_COLLECTIONS", default=20)
+    PROFILE_PAGE_RECS: int = config("PROFILE_PAGE_RECS", default=10)
+
+
+class RedisRateLimiterSettings(BaseSettings):
+    # counted on the cache's Redis pool
+    RATE_LIMIT_ENABLED: bool = config("RATE_LIMIT_ENABLED", default=True)
+    # let requests through when Redis can't be reached, rather than fail them
+    RATE_LIMIT_FAIL_OPEN: bool = config("RATE_LIMIT_FAIL_OPEN", default=True)
+    # requests a worker takes from Redis at once and hands out locally
+    RATE_LIMIT_LOCAL_BATCH: int = config("RATE_LIMIT_LOCAL_BATCH", default=5)
+    RATE_LIMIT_LOCAL_SIZE: int = config("RATE_LIMIT_LOCAL_SIZE", default=10000)
 
 
 class DefaultRateLimitSettings(BaseSettings):
-    DEFAULT_RATE_LIMIT_LIMIT: int = config("DEFAULT_RATE_LIMIT_LIMIT", default=10)
-    DEFAULT_RATE_LIMIT_PERIOD: int = config("DEFAULT_RATE_LIMIT_PERIOD", default=3600)
+    # per IP and per user, for every route without its own limit
+    DEFAULT_RATE_LIMIT_LIMIT: int = config("DEFAULT_RATE_LIMIT_LIMIT", default=600)
+    DEFAULT_RATE_LIMIT_PERIOD: int = config("DEFAULT_RATE_LIMIT_PERIOD", default=60)
 
 
 # class EnvironmentOption(Enum):
@@ -56,7 +155,18 @@ class Settings(
     CryptSettings,
     MongoDBSettings,
     RedisCacheSettings,
-    # RedisRateLimiterSettings,
+    LocalCacheSettings,
+    HttpCacheSettings,
+    UsernameCacheSettings,
+    ReclistOwnerCacheSettings,
+    PaginationSettings,
+    ImportSettings,
+    SanitizeSettings,
+    SearchSettings,
+    MetricsSettings,
+    ServerSettings,
+    AvatarSettings,
+    RedisRateLimiterSettings,
     DefaultRateLimitSettings,
     # EnvironmentSettings,
 ):
@@ -1,2 +1,67 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from passlib.context import CryptContext
-PW_CONTEXT = CryptContext(schemes=["bcrypt"], deprecated="auto")
\ No newline at end of file
+from app.security.config import settings
+from app.utils.errors import ServiceUnavailableProblem
+
+PW_CONTEXT = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+class PasswordHasher:
+    """Runs bcrypt on a bounded thread pool so it never blocks the event loop.
+
+    bcrypt releases the GIL, so threads give real parallelism. Once
+    ``queue_limit`` calls are in flight new ones are rejected with a 503
+    instead of piling up behind a login storm.
+    """
+    def __init__(self, workers: int, queue_limit: int):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password")
+        self.pending = 0
+        self.calls = 0
+        self.rejected = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    async def run(self, func, *args):
+        if self.pending >= self.queue_limit:
+            self.rejected += 1
+            raise ServiceUnavailableProblem(detail="Too many logins, try again shortly", headers={"Retry-After": "1"})
+
+        submitted = time.perf_counter()
+
+        def job():
+            return time.perf_counter() - submitted, func(*args)
+
+        self.pending += 1
+        try:
+            wait, result = await asyncio.get_running_loop().run_in_executor(self.executor, job)
+        finally:
+            self.pending -= 1
+
+        self.calls += 1
+        self.wait_seconds_total += wait
+        self.wait_seconds_max = max(self.wait_seconds_max, wait)
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self.run(PW_CONTEXT.hash, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self.run(PW_CONTEXT.verify, password, hashed)
+
+    def metrics(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "pending": self.pending,
+            "calls": self.calls,
+            "rejected": self.rejected,
+            "wait_seconds_total": self.wait_seconds_total,
+            "wait_seconds_max": self.wait_seconds_max,
+        }
+
+
+password_hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_QUEUE_LIMIT)
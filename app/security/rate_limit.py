@@ -0,0 +1,232 @@
+import logging
+import math
+import time
+from typing import NamedTuple
+from fastapi import Request
+from redis.exceptions import RedisError
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.db.local_cache import LocalCache
+from app.db.redis import redis_pool
+from app.security.config import settings
+from app.security.token import decode_token
+from app.utils.errors import TooManyRequestsProblem
+from app.utils.metrics import rate_limit_requests
+
+logger = logging.getLogger("uvicorn.error")
+
+
+class RateLimit(NamedTuple):
+    limit: int
+    # seconds
+    period: int
+
+
+# by route name (the function name, or the name given to @endpoint in class
+# views), each with its own window; every other route shares the default one
+ROUTE_LIMITS: dict[str, RateLimit] = {
+    # every attempt is a bcrypt verify, and the target of credential stuffing
+    "login": RateLimit(10, 60),
+    "create_user": RateLimit(5, 3600),
+    "update_password": RateLimit(10, 3600),
+    "import_recs": RateLimit(30, 3600),
+    # what scrapers walk
+    "public_recs": RateLimit(120, 60),
+    "public_rec": RateLimit(120, 60),
+    "public_search": RateLimit(60, 60),
+}
+
+
+# Sliding window counter for each of KEYS: the current fixed window's count
+# plus the previous window's, weighted by how much of it the sliding window
+# still covers. ARGV[1] is how many requests to take, then a limit and a
+# period (ms) per key. Takes the same amount from every key, as much as all
+# of them have left up to ARGV[1], or nothing. Returns how many were taken,
+# then remaining, ms until the window resets and ms to wait before retrying
+# for each key. Uses the Redis clock so every worker shares one.
+SLIDING_WINDOW = """
+local time = redis.call("TIME")
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local granted = tonumber(ARGV[1])
+local windows = {}
+for i, key in ipairs(KEYS) do
+    local limit = tonumber(ARGV[i * 2])
+    local period = tonumber(ARGV[i * 2 + 1])
+    local window = math.floor(now / period)
+    local elapsed = now - window * period
+    local previous = tonumber(redis.call("GET", key .. ":" .. (window - 1)) or "0")
+    local current = tonumber(redis.call("GET", key .. ":" .. window) or "0")
+    local free = math.floor(limit - current - previous * (period - elapsed) / period)
+    local retry = 0
+    if free < 1 then
+        if current >= limit then
+            -- full on its own, wait for it to become the previous window
+            -- and age out enough
+            retry = period - elapsed + math.ceil(period * (current - limit + 1) / current)
+        else
+            retry = math.ceil(period - elapsed - period * (limit - 1 - current) / previous)
+        end
+    end
+    granted = math.min(granted, free)
+    windows[i] = {key .. ":" .. window, period, free, period - elapsed, math.max(retry, 0)}
+end
+granted = math.max(granted, 0)
+local result = {granted}
+for _, window in ipairs(windows) do
+    if granted > 0 then
+        redis.call("INCRBY", window[1], granted)
+        redis.call("PEXPIRE", window[1], window[2] * 2)
+    end
+    result[#result + 1] = math.max(window[3] - granted, 0)
+    result[#result + 1] = window[4]
+    result[#result + 1] = window[5]
+end
+return result
+"""
+
+
+def route_policy(scope: Scope) -> tuple[str, RateLimit]:
+    route = scope.get("route")
+    name = route.name if route is not None else ""
+    if name in ROUTE_LIMITS:
+        return name, ROUTE_LIMITS[name]
+    return "default", RateLimit(settings.DEFAULT_RATE_LIMIT_LIMIT, settings.DEFAULT_RATE_LIMIT_PERIOD)
+
+
+def token_user(access_token: str | None) -> str | None:
+    # only tokens that verify count as a user, anything else is just the IP
+    if not access_token:
+        return None
+    try:
+        return decode_token(access_token.split(" ")[-1]).get("sub")
+    except Exception:
+        return None
+
+
+def limit_headers(policy: RateLimit, remaining: int, reset: float) -> dict:
+    return {
+        "RateLimit-Limit": str(policy.limit),
+        "RateLimit-Remaining": str(max(remaining, 0)),
+        "RateLimit-Reset": str(max(math.ceil(reset), 0)),
+        "RateLimit-Policy": f"{policy.limit};w={policy.period}",
+    }
+
+
+class RateLimiter:
+    """Per IP and per user limits, counted in Redis by SLIDING_WINDOW.
+
+    Each worker takes up to ``batch`` requests from the window at once and
+    hands them out locally, a token bucket refilled from Redis, so most
+    requests never reach Redis. Denials are remembered locally until their
+    retry time, so a client hammering a worker past its limit costs nothing.
+    Tokens a worker took but didn't use count as used, which errs on the
+    side of limiting early.
+    """
+    def __init__(self, local_size: int, batch: int):
+        self.batch = batch
+        # (policy, ip, user) -> bucket: tokens left, remaining in Redis
+        # after them, reset time, and retry time when denied
+        self.buckets = LocalCache(local_size, ttl=60)
+
+    def take_size(self, policy: RateLimit) -> int:
+        # low limits (login) are counted exactly
+        return max(1, min(self.batch, policy.limit // 10))
+
+    async def hit(self, name: str, policy: RateLimit, ip: str, user: str | None) -> tuple[dict, float]:
+        """Takes one request for ``ip`` and ``user`` under ``policy``.
+        Returns the RateLimit headers and, when denied, seconds to wait."""
+        now = time.monotonic()
+        bucket_key = (name, ip, user)
+        bucket = self.buckets.get(bucket_key)
+        if bucket is not None:
+            if bucket["retry_at"] > now:
+                rate_limit_requests.inc(name, "local", "denied")
+                return limit_headers(policy, 0, bucket["reset_at"] - now), bucket["retry_at"] - now
+            if bucket["tokens"] > 0 and bucket["reset_at"] > now:
+                bucket["tokens"] -= 1
+                rate_limit_requests.inc(name, "local", "allowed")
+                remaining = bucket["remaining"] + bucket["tokens"]
+                return limit_headers(policy, remaining, bucket["reset_at"] - now), 0
+
+        keys = [f"ratelimit_{name}_ip_{ip}"]
+        if user:
+            keys.append(f"ratelimit_{name}_user_{user}")
+        period_ms = policy.period * 1000
+        script = redis_pool.client.register_script(SLIDING_WINDOW)
+        result = await script(
+            keys=keys,
+            args=[self.take_size(policy)] + [policy.limit, period_ms] * len(keys)
+        )
+        granted = int(result[0])
+        windows = [result[i:i + 3] for i in range(1, len(result), 3)]
+        remaining = min(int(window[0]) for window in windows)
+        reset = min(int(window[1]) for window in windows) / 1000
+        retry = max(int(window[2]) for window in windows) / 1000
+
+        if granted:
+            self.buckets.set(
+                bucket_key,
+                {"tokens": granted - 1, "remaining": remaining, "reset_at": now + reset, "retry_at": 0},
+                ttl=reset
+            )
+            rate_limit_requests.inc(name, "redis", "allowed")
+            return limit_headers(policy, remaining + granted - 1, reset), 0
+
+        retry = max(retry, 0.001)
+        self.buckets.set(
+            bucket_key,
+            {"tokens": 0, "remaining": 0, "reset_at": now + reset, "retry_at": now + retry},
+            ttl=retry
+        )
+        rate_limit_requests.inc(name, "redis", "denied")
+        return limit_headers(policy, 0, reset), retry
+
+
+rate_limiter = RateLimiter(settings.RATE_LIMIT_LOCAL_SIZE, settings.RATE_LIMIT_LOCAL_BATCH)
+
+
+async def rate_limit(request: Request) -> None:
+    """Router dependency, so the matched route picks the policy. Leaves the
+    headers in the request state for RateLimitHeadersMiddleware, which adds
+    them to whatever response goes out, cached ones included."""
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+    name, policy = route_policy(request.scope)
+    # the proxy's X-Forwarded-For when it's in FORWARDED_ALLOW_IPS
+    ip = request.client.host if request.client else "unknown"
+    user = token_user(request.cookies.get("access_token"))
+    try:
+        headers, retry = await rate_limiter.hit(name, policy, ip, user)
+    except RedisError as error:
+        if not settings.RATE_LIMIT_FAIL_OPEN:
+            raise
+        logger.warning("rate limit check failed, letting the request through: %s", error)
+        return
+    if retry:
+        headers["Retry-After"] = str(math.ceil(retry))
+    request.state.rate_limit = headers
+    if retry:
+        raise TooManyRequestsProblem(detail="Rate limit exceeded, try again later")
+
+
+class RateLimitHeadersMiddleware:
+    """Adds the RateLimit-* (and Retry-After) headers rate_limit left in
+    the request state to the response."""
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = scope.get("state", {}).get("rate_limit")
+                if headers:
+                    response_headers = MutableHeaders(scope=message)
+                    for name, value in headers.items():
+                        response_headers[name] = value
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
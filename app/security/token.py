@@ -1,7 +1,27 @@
-from jose import jwt
+import hashlib
+import time
+import jwt as pyjwt
+from jose import jwt as jose_jwt
+from app.db.local_cache import LocalCache
 from app.security.config import settings
 from datetime import timedelta, UTC, datetime
 
+# both expose encode(claims, key, algorithm=) and decode(token, key, algorithms=)
+JWT_BACKENDS = {"jose": jose_jwt, "pyjwt": pyjwt}
+
+
+def get_jwt_backend(name: str):
+    try:
+        return JWT_BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"unknown JWT backend {name!r}, expected one of {sorted(JWT_BACKENDS)}")
+
+
+jwt = get_jwt_backend(settings.JWT_BACKEND)
+# claims of tokens that already passed verification, keyed by token hash
+verified_tokens = LocalCache(settings.TOKEN_CACHE_SIZE, settings.TOKEN_CACHE_TTL)
+
+
 def create_access_token(user_id: str) -> str:
     expire = datetime.now(UTC) + timedelta(int(settings.ACCESS_TOKEN_EXPIRE))
     encoded_jwt = jwt.encode(
@@ -10,16 +30,22 @@ def create_access_token(user_id: str) -> str:
         algorithm=settings.ALGORITHM
     )
     return encoded_jwt
-    
+
+def decode_token(access_token: str) -> dict:
+    key = hashlib.sha256(access_token.encode()).digest()
+    claims = verified_tokens.get(key)
+    if claims is None:
+        claims = jwt.decode(
+            access_token,
+            settings.SECRET_KEY,
+            algorithms=[settings.ALGORITHM]
+        )
+        ttl = settings.TOKEN_CACHE_TTL
+        if "exp" in claims:
+            # never trusted past its own expiry
+            ttl = min(ttl, claims["exp"] - time.time())
+        verified_tokens.set(key, claims, ttl)
+    return claims
+
 def get_current_user(access_token: str) -> str:
-    payload = jwt.decode(
-        access_token, 
-        settings.SECRET_KEY, 
-        algorithms=[settings.ALGORITHM]
-    )
-    user_id = payload.get("sub")
-    return user_id
-    
-def authorize_user(access_token: str, user_id: str) -> bool:
-    current_user = get_current_user(access_token)
-    return current_user == user_id
\ No newline at end of file
+    return decode_token(access_token).get("sub")
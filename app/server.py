@@ -0,0 +1,58 @@
+"""Production entry point, ``python -m app.server``.
+
+Runs uvicorn with WEB_CONCURRENCY worker processes (one per available CPU
+when unset), on uvloop and httptools. Each worker imports the app and runs
+its own lifespan, so the Motor and Redis pools, the near cache and the
+password pool are per worker; size them per process. On SIGTERM workers
+stop accepting, let in-flight requests finish for up to
+SERVER_GRACEFUL_TIMEOUT seconds, then close their pools.
+"""
+import math
+import os
+import uvicorn
+from app.security.config import settings
+
+
+def available_cpus() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 1
+    # a container CPU limit (cgroup v2) isn't reflected in the affinity mask
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as cpu_max:
+            quota, period = cpu_max.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def server_options(**overrides) -> dict:
+    options = dict(
+        host=settings.SERVER_HOST,
+        port=settings.SERVER_PORT,
+        workers=settings.WEB_CONCURRENCY or available_cpus(),
+        loop="uvloop",
+        http="httptools",
+        backlog=settings.SERVER_BACKLOG,
+        timeout_keep_alive=settings.SERVER_KEEP_ALIVE,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT,
+        limit_concurrency=settings.SERVER_LIMIT_CONCURRENCY,
+        proxy_headers=True,
+        forwarded_allow_ips=settings.FORWARDED_ALLOW_IPS,
+        access_log=settings.SERVER_ACCESS_LOG,
+        server_header=False,
+    )
+    options.update(overrides)
+    return options
+
+
+def main() -> None:
+    # an import string, so every worker process imports its own app
+    uvicorn.run("app.main:app", **server_options())
+
+
+if __name__ == "__main__":
+    main()
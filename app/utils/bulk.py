@@ -0,0 +1,98 @@
+import asyncio
+import orjson
+from fastapi import Request
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+
+# never taken from the upload, the server decides these
+PROTECTED_FIELDS = ("_id", "id", "revision_id", "deleted", "created")
+
+
+async def read_body(request: Request, max_bytes: int) -> bytes:
+    # raises ValueError once the upload passes max_bytes, without reading the rest
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > max_bytes:
+            raise ValueError(f"upload is larger than {max_bytes} bytes")
+    return bytes(body)
+
+
+def parse_documents(body: bytes, ndjson: bool) -> list:
+    """Splits an upload into items, a JSON array or one object per line.
+
+    A line of NDJSON that doesn't parse becomes an error string in its
+    place, so the rest still import. A JSON array that doesn't parse
+    raises ValueError.
+    """
+    if not ndjson:
+        try:
+            items = orjson.loads(body)
+        except orjson.JSONDecodeError as error:
+            raise ValueError(f"invalid JSON: {error}")
+        if not isinstance(items, list):
+            raise ValueError("expected a JSON array")
+        return items
+
+    items = []
+    for line in body.splitlines():
+        if not line.strip():
+            continue
+        try:
+            items.append(orjson.loads(line))
+        except orjson.JSONDecodeError as error:
+            items.append(f"invalid JSON: {error}")
+    return items
+
+
+def validation_messages(error: ValidationError) -> list:
+    return [
+        f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}"
+        for detail in error.errors()
+    ]
+
+
+async def insert_documents(model, items: list, fields: dict, batch_size: int) -> tuple[int, list]:
+    """Validates and inserts ``items`` as ``model`` documents, batch_size at
+    a time, with ``fields`` set on every one.
+
+    Each batch is a single unordered insert_many, so one bad document
+    doesn't stop the rest. Returns the number inserted and
+    ``[{"index", "errors"}]`` for every item that wasn't.
+    """
+    inserted = 0
+    errors = []
+    for start in range(0, len(items), batch_size):
+        documents, indexes = [], []
+        for index, item in enumerate(items[start:start + batch_size], start):
+            if isinstance(item, str):
+                errors.append({"index": index, "errors": [item]})
+                continue
+            if not isinstance(item, dict):
+                errors.append({"index": index, "errors": ["expected a JSON object"]})
+                continue
+            for name in PROTECTED_FIELDS:
+                item.pop(name, None)
+            try:
+                documents.append(model(**{**item, **fields}))
+            except ValidationError as error:
+                errors.append({"index": index, "errors": validation_messages(error)})
+                continue
+            indexes.append(index)
+
+        if documents:
+            try:
+                await model.insert_many(documents, ordered=False)
+                inserted += len(documents)
+            except BulkWriteError as error:
+                inserted += error.details["nInserted"]
+                for write_error in error.details["writeErrors"]:
+                    errors.append({
+                        "index": indexes[write_error["index"]],
+                        "errors": [write_error["errmsg"]]
+                    })
+        # validation is CPU bound, let other requests in between batches
+        await asyncio.sleep(0)
+
+    errors.sort(key=lambda error: error["index"])
+    return inserted, errors
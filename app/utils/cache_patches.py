@@ -0,0 +1,67 @@
+"""Patches for QueryHandler.write_through.
+
+Items and pages are in their cached, JSON-compatible form. Page fields are
+``"{limit}:{cursor}"`` and hold ``{"items", "next_cursor"}``, sorted by
+``_id``; other hash fields (``rec:{id}``) are left alone unless named.
+"""
+from beanie import PydanticObjectId
+from app.db.redis import DROP
+from app.utils.pagination import encode_cursor
+
+
+def page_limit(field: str) -> int | None:
+    limit, _, _ = field.partition(":")
+    return int(limit) if limit.isdigit() else None
+
+
+def replace_value(item: dict):
+    return lambda value: item
+
+
+def replace_in_pages(item: dict):
+    def patch(field: str, page: dict):
+        if page_limit(field) is None:
+            return None
+        for index, existing in enumerate(page["items"]):
+            if existing["_id"] == item["_id"]:
+                page["items"][index] = item
+                return page
+        return None
+    return patch
+
+
+def drop_from_pages(item_id: str, *fields: str):
+    # a page that loses an item is just short, later pages start after
+    # their own cursor so nothing shifts
+    def patch(field: str, page: dict):
+        if field in fields:
+            return DROP
+        if page_limit(field) is None:
+            return None
+        items = [existing for existing in page["items"] if existing["_id"] != item_id]
+        if len(items) == len(page["items"]):
+            return None
+        if not items and page["next_cursor"]:
+            # an empty page that isn't the last reads as a bug, refetch it
+            return DROP
+        page["items"] = items
+        return page
+    return patch
+
+
+def append_to_pages(item: dict):
+    # a new document sorts last, so only the final page of each size changes
+    def patch(field: str, page: dict):
+        limit = page_limit(field)
+        if limit is None or page["next_cursor"]:
+            return None
+        items = page["items"]
+        if items and items[-1]["_id"] >= item["_id"]:
+            # out of order (clock skew between app servers), refetch it
+            return DROP
+        if len(items) < limit:
+            items.append(item)
+        else:
+            page["next_cursor"] = encode_cursor(PydanticObjectId(items[-1]["_id"]))
+        return page
+    return patch
@@ -0,0 +1,59 @@
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# headers a 304 has to repeat from the 200 it stands in for
+NOT_MODIFIED_HEADERS = {"cache-control", "content-location", "date", "etag", "expires", "vary"}
+
+
+def etag_matches(etag: str, if_none_match: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # weak comparison, as If-None-Match calls for
+    etag = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == etag
+        for candidate in if_none_match.split(",")
+    )
+
+
+class ConditionalGetMiddleware:
+    """Answers GET/HEAD with 304 Not Modified when the response's ETag
+    matches If-None-Match, dropping the body before it goes on the wire.
+
+    Views set the ETag (cached responses carry the hash stored with the
+    value); responses without one pass through untouched.
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        if not if_none_match:
+            await self.app(scope, receive, send)
+            return
+
+        not_modified = False
+
+        async def conditional_send(message: Message) -> None:
+            nonlocal not_modified
+            if message["type"] == "http.response.start":
+                etag = MutableHeaders(raw=message["headers"]).get("etag")
+                if message["status"] == 200 and etag and etag_matches(etag, if_none_match):
+                    not_modified = True
+                    headers = [
+                        (name, value) for name, value in message["headers"]
+                        if name.decode("latin-1").lower() in NOT_MODIFIED_HEADERS
+                    ]
+                    await send({"type": "http.response.start", "status": 304, "headers": headers})
+                    return
+            elif not_modified:
+                if not message.get("more_body", False):
+                    await send({"type": "http.response.body", "body": b""})
+                return
+            await send(message)
+
+        await self.app(scope, receive, conditional_send)
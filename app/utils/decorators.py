@@ -1,6 +1,6 @@
 from functools import wraps
-from app.schemas import User
 from app.security.token import get_current_user
+from app.utils.resolver import username_resolver
 
 def public_user(func):
     @wraps(func)
@@ -11,22 +11,14 @@ def public_user(func):
 
         username = kwargs["username"]
         try:
-            user = await User.find_by_username(username)
-            if not user.is_active:
-                raise view.not_found()
+            user = await username_resolver.resolve(username)
         except:
             raise view.server_problem()
 
+        if not user["user_id"] or not user["is_active"]:
+            raise view.not_found()
 
-        await view.redis.open()
-        redis_key = f"public_user_{username}"
-        redis_query = await view.redis.get_redis(redis_key)
-        if redis_query:
-            view.user_id = redis_query
-        
-        if not redis_query:
-            view.user_id = str(user.id)
-            await view.redis.set_redis(redis_key, str(user.id))
+        view.user_id = user["user_id"]
 
         return await func(*args, **kwargs)
     return wrapper
@@ -43,11 +35,11 @@ def auth_user(func):
             raise view.unauthorized("Please log in")
 
         try:
-            user_id = get_current_user(token.split(" ")[1])
+            view.user_id = get_current_user(token.split(" ")[1])
         except:
             raise view.unauthorized("Please log in")
-        
-        view.user_id = user_id
+        if not view.user_id:
+            raise view.unauthorized("Please log in")
 
         return await func(*args, **kwargs)
     return wrapper
\ No newline at end of file
@@ -1,8 +1,18 @@
 from starlette.exceptions import HTTPException
+from fastapi_problem.error import StatusProblem
 
 class ExpirationProblem(HTTPException):
      status_code: int = 307
      detail: str = "Token has expired"
 
      def __init__(self):
-         super().__init__(status_code=self.status_code, detail=self.detail)
\ No newline at end of file
+         super().__init__(status_code=self.status_code, detail=self.detail)
+
+class ServiceUnavailableProblem(StatusProblem):
+     title: str = "Service unavailable."
+     status: int = 503
+
+
+class TooManyRequestsProblem(StatusProblem):
+     title: str = "Too many requests."
+     status: int = 429
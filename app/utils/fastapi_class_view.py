@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import inspect
 import re
 from collections.abc import Callable, Iterable
 
@@ -21,6 +22,23 @@ def _view_class_name_default_parser(cls: object, method: str):
     return f"{method.capitalize()} {class_name}"
 
 
+def _request_scoped_endpoint(cls: type, callable_name: str, bound: Callable) -> Callable:
+    # A fresh view instance per request keeps state written by decorators
+    # (user_id, public, base) from leaking between concurrent requests.
+    if inspect.iscoroutinefunction(bound):
+        async def _endpoint(*args, **kwargs):
+            return await getattr(cls(), callable_name)(*args, **kwargs)
+    else:
+        def _endpoint(*args, **kwargs):
+            return getattr(cls(), callable_name)(*args, **kwargs)
+
+    _endpoint.__name__ = getattr(bound, "__name__", callable_name)
+    _endpoint.__qualname__ = getattr(bound, "__qualname__", callable_name)
+    _endpoint.__doc__ = bound.__doc__
+    _endpoint.__signature__ = inspect.signature(bound)
+    return _endpoint
+
+
 def View(
     router: FastAPI | APIRouter,
     *,
@@ -30,6 +48,9 @@ def View(
 ):
     """Class-based view decorator for FastAPI.
 
+    The class is instantiated once to collect routes, and again for every
+    request, so keep ``__init__`` cheap.
+
     ### Example:
         >>> from fastapi import FastAPI
         >>> from fastapi_class import View
@@ -63,7 +84,7 @@ def View(
                     _path = path + metadata.path
                 router.add_api_route(
                     _path,
-                    _callable,
+                    _request_scoped_endpoint(cls, _callable_name, _callable),
                     methods=list(metadata.methods),
                     response_class=metadata.response_class_or_default(
                         cls_based_response_class.get(_callable_name, JSONResponse)
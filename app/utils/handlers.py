@@ -1,6 +1,11 @@
-from app.schemas import RecList
+import asyncio
+import logging
+from app.schemas import RecList, Rec, RecCard
 from app.db.redis import RedisClient
-from typing import List
+from app.db.near_cache import near_cache
+from app.security.config import settings
+from fastapi import Response
+from fastapi.responses import StreamingResponse
 from fastapi_problem.error import (
     ServerProblem, 
     BadRequestProblem, 
@@ -9,6 +14,20 @@ from fastapi_problem.error import (
     ConflictProblem
 )
 from app.utils.errors import ExpirationProblem
+from app.utils.pagination import decode_cursor, encode_cursor, page_field
+from app.utils.streaming import NDJSON, json_array, ndjson
+from app.utils.single_flight import single_flight
+from app.utils.metrics import redis_cache_requests
+from app.utils.resolver import reclist_owners
+from redis.exceptions import LockError
+
+logger = logging.getLogger("uvicorn.error")
+
+# kept past REDIS_CACHE_TTL for the stale window, where it's still served
+# while one request refreshes it
+CACHE_EX = settings.REDIS_CACHE_TTL + settings.REDIS_CACHE_STALE_TTL
+LOCK_POLL = 0.05
+revalidating: set = set()
 
 class QueryHandler:
 
@@ -19,67 +38,308 @@ class QueryHandler:
     conflict = ConflictProblem
     expiration = ExpirationProblem
 
+    scope = "user"    # "reclist" when query_id is a reclist id
+    near_cached = False   # keep hot responses in this worker too
+
     def __init__(self):
         self.redis = RedisClient()
         super().__init__()
     
+    def owns(self, document) -> bool:
+        # documents link their owner, user_id is the caller (or, on public
+        # routes, the profile being viewed)
+        return str(document.user.ref.id) == self.user_id
+
+    async def authorize_reclist(self, reclist_id: str) -> None:
+        # keys under a reclist id are the same for every caller, so check
+        # it's the caller's (or the viewed profile's) before the cache does
+        if await reclist_owners.resolve(reclist_id) != self.user_id:
+            raise self.not_found()
+
     def redis_key(self, query_id: str) -> str:
         return f"{self.base}_{self.key}_{query_id}"
 
-    def update_redis_keys(self, query_id: str, parent: bool = False) -> list:
-        match parent:
-            case True:
-                auth = f"auth_{self.parent_view.key}_{query_id}"
-                public = f"public_{self.parent_view.key}_{query_id}"
-            case False:
-                auth = f"auth_{self.key}_{query_id}"
-                public = f"public_{self.key}_{query_id}"
-        return [auth, public]
-    
-    async def redis_query(self, query_id: str):
+    def redis_tag(self, query_id: str, parent: bool = False, child: bool = False) -> str:
+        # one tag per key family and id, shared by the auth_ and public_ keys
+        match parent, child:
+            case True, _:
+                key = self.parent_view.key
+            case _, True:
+                key = self.child_key
+            case _:
+                key = self.key
+        return f"{key}_{query_id}"
+
+    def redis_tags(self, query_id: str) -> list:
+        # everything a cached key depends on, so deleting a user or a
+        # reclist drops all of it without scanning the keyspace
+        tags = [self.redis_tag(query_id), f"user_{self.user_id}"]
+        if self.scope == "reclist":
+            tags.append(f"reclist_{query_id}")
+        return tags
+
+    def cached_response(self, cached: tuple[bytes, str]) -> Response:
+        body, etag = cached
+        cache_control = settings.PUBLIC_CACHE_CONTROL if self.public else settings.PRIVATE_CACHE_CONTROL
+        return Response(
+                content=body,
+                media_type="application/json",
+                headers={"ETag": f'"{etag}"', "Cache-Control": cache_control}
+            )
+
+    async def cached_json(self, query_id: str, field: str | None = None, refresh=None) -> tuple[bytes, str] | None:
+        # with refresh given, a body in its stale window is still served
+        # while refresh reloads it in the background
+        redis_key = self.redis_key(query_id)
+        if self.near_cached:
+            cached = near_cache.get(self.key, redis_key, field)
+            if cached is not None:
+                return cached
+
+        if refresh and settings.REDIS_CACHE_STALE_TTL:
+            cached, ttl = await self.redis.get_redis_raw_ttl(redis_key, field)
+            if cached and 0 <= ttl < settings.REDIS_CACHE_STALE_TTL * 1000:
+                self.revalidate(query_id, field, refresh)
+        elif field is None:
+            cached = await self.redis.get_redis_raw(redis_key)
+        else:
+            cached = await self.redis.hget_redis_raw(redis_key, field)
+        redis_cache_requests.inc(self.key, "hit" if cached else "miss")
+
+        if cached and self.near_cached:
+            near_cache.set(self.key, redis_key, field, cached)
+        return cached
+
+    async def redis_query(self, query_id: str) -> Response | None:
+        cached = await self.cached_json(
+                query_id,
+                refresh=lambda: self.load_item(query_id)
+            )
+        if cached:
+            return self.cached_response(cached)
+
+    async def redis_query_field(self, query_id: str, field: str) -> Response | None:
+        cached = await self.cached_json(query_id, field)
+        if cached:
+            return self.cached_response(cached)
+
+    async def redis_query_page(self, query_id: str, limit: int, cursor: str | None) -> Response | None:
+        cached = await self.cached_json(
+                query_id,
+                page_field(limit, cursor),
+                refresh=lambda: self.load_page(query_id, limit, cursor, renew=True)
+            )
+        if cached:
+            return self.cached_response(cached)
+
+    async def coalesce(self, query_id: str, field: str | None, load, wait: bool = True):
+        """Runs ``load`` (which fills the cache) once across requests.
+
+        Callers in this worker share one call; across workers a short Redis
+        lock picks who loads and the rest poll the cache for the result. With
+        wait False, gives up and returns None if another worker holds the lock.
+        """
+        name = self.flight_name(query_id, field)
+        if not wait:
+            name = f"{name}:refresh"
+        return await single_flight.run(
+                name,
+                lambda: self.load_locked(query_id, field, load, wait)
+            )
+
+    def flight_name(self, query_id: str, field: str | None) -> str:
+        # load runs with the caller's permissions and its result (or error)
+        # goes to everyone sharing the flight, so auth views don't share
+        # one across users
+        name = f"{self.redis_key(query_id)}:{field or ''}"
+        if not self.public:
+            name = f"{name}:{self.user_id}"
+        return name
+
+    async def load_locked(self, query_id: str, field: str | None, load, wait: bool):
         redis_key = self.redis_key(query_id)
-        await self.redis.open()
-        return await self.redis.get_redis(redis_key)
+        lock = self.redis.lock(self.flight_name(query_id, field))
+        if await lock.acquire():
+            try:
+                return await load()
+            finally:
+                try:
+                    await lock.release()
+                except LockError:
+                    # outlived its TTL, someone else may hold it now
+                    pass
+        if not wait:
+            return None
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.REDIS_CACHE_LOCK_TTL
+        while loop.time() < deadline:
+            await asyncio.sleep(LOCK_POLL)
+            if field is None:
+                cached = await self.redis.get_redis_raw(redis_key)
+            else:
+                cached = await self.redis.hget_redis_raw(redis_key, field)
+            if cached:
+                return self.cached_response(cached)
+            if not await lock.locked():
+                # the holder finished without caching anything (not found,
+                # bad cursor...), so find out for ourselves
+                break
+        return await load()
+
+    def revalidate(self, query_id: str, field: str | None, refresh) -> None:
+        async def run():
+            try:
+                await self.coalesce(query_id, field, refresh, wait=False)
+            except Exception:
+                logger.exception("refreshing %s failed", self.redis_key(query_id))
+
+        task = asyncio.create_task(run())
+        revalidating.add(task)
+        task.add_done_callback(revalidating.discard)
+
+    async def invalidate(self, *tags: str, keys: list = ()) -> None:
+        dropped = await self.redis.invalidate(tags, keys)
+        # other workers hear about it over pub/sub, this one shouldn't wait
+        near_cache.evict(dropped)
 
     async def delete_redis_item(self, query_id: str) -> None:
-        redis_keys = self.update_redis_keys(query_id)
-        for key in redis_keys:
-            await self.redis.delete(key)
+        await self.invalidate(self.redis_tag(query_id))
+
+    def profile_page_tag(self) -> str:
+        # the public profile overview, which embeds collections and recs
+        return f"profile_page_{self.user_id}"
 
-    async def delete_redis_parent(self, query_id: str) -> None:
-        redis_keys = self.update_redis_keys(query_id, parent=True)
-        for key in redis_keys:
-            await self.redis.delete(key)
+    def cache_keys(self, key: str, query_id: str) -> list:
+        # the auth_ and public_ copies of one value
+        return [f"{base}_{key}_{query_id}" for base in ("auth", "public")]
+
+    async def write_through(self, keys: list, patch, hashed: bool = False, tags: tuple = ()) -> None:
+        # patches cached copies in place (see app.utils.cache_patches) so the
+        # next read doesn't go to MongoDB; whatever can't be patched is
+        # dropped instead, along with any tags given
+        if settings.REDIS_CACHE_WRITE_THROUGH:
+            patcher = self.redis.patch_redis_hash if hashed else self.redis.patch_redis
+            failed = [key for key in keys if not await patcher(key, patch)]
+            near_cache.evict(keys)
+        else:
+            failed = keys
+        if failed or tags:
+            await self.invalidate(*tags, keys=failed)
 
     async def update_redis_item(self, query_id: str):
+        return await self.coalesce(query_id, None, lambda: self.load_item(query_id))
+
+    async def load_item(self, query_id: str) -> Response | None:
         redis_key = self.redis_key(query_id)
         value = await self.RESPONSE_MODEL.query_item(
                     query_id,
                     self.public
                 )
-        if value:
-            await self.redis.set_redis(redis_key, value)
-        return value
+        if not value:
+            return None
+        # answer from the stored bytes, they're already serialized
+        data = await self.redis.set_redis(
+                redis_key,
+                value,
+                ex=CACHE_EX,
+                tags=self.redis_tags(query_id)
+            )
+        return self.cached_response(self.redis.codec.render_tagged(data))
+
+    def page_after(self, cursor: str | None):
+        try:
+            return decode_cursor(cursor) if cursor else None
+        except ValueError:
+            raise self.bad_request(detail="Invalid cursor")
+
+    async def update_redis_page(self, query_id: str, limit: int, cursor: str | None):
+        return await self.coalesce(
+                query_id,
+                page_field(limit, cursor),
+                lambda: self.load_page(query_id, limit, cursor)
+            )
+
+    async def load_page(self, query_id: str, limit: int, cursor: str | None, renew: bool = False) -> Response:
+        after = self.page_after(cursor)
+
+        # one extra item tells us whether there is a next page
+        items = await self.RESPONSE_MODEL.query(
+                query_id,
+                self.public,
+                limit=limit + 1,
+                after=after,
+                projection=await self.list_projection(query_id)
+            )
+        next_cursor = encode_cursor(items[limit - 1].id) if len(items) > limit else None
+        value = {"items": items[:limit], "next_cursor": next_cursor}
 
-    async def update_redis_list(self, query_id: str) -> list:
         redis_key = self.redis_key(query_id)
-        value = await self.RESPONSE_MODEL.query(
+        data = await self.redis.hset_redis(
+                redis_key,
+                page_field(limit, cursor),
+                value,
+                ex=CACHE_EX,
+                tags=self.redis_tags(query_id),
+                renew=renew,
+                max_fields=settings.PAGE_CACHE_MAX_FIELDS
+            )
+        return self.cached_response(self.redis.codec.render_tagged(data))
+
+    async def list_projection(self, query_id: str):
+        # projection model for list views, None loads whole documents
+        return None
+
+    async def stream_list(self, query_id: str, cursor: str | None, accept: str | None) -> StreamingResponse:
+        # streams straight from the database cursor, bypassing the cache
+        documents = self.RESPONSE_MODEL.query_cursor(
                 query_id,
-                self.public
+                self.public,
+                self.page_after(cursor),
+                await self.list_projection(query_id)
             )
-        if value:
-            await self.redis.set_redis(redis_key, value)
-        return value
-    
+        if accept and NDJSON in accept:
+            return StreamingResponse(ndjson(documents), media_type=NDJSON)
+        return StreamingResponse(json_array(documents), media_type="application/json")
+
     async def redis_deactivate(self) -> None:
-        redis_keys = self.redis.scan(self.user_id)
-        await self.scan_delete(redis_keys)
+        await self.invalidate(f"user_{self.user_id}")
 
-        reclists = RecList.query(self.user_id)
-        for reclist in reclists:
-            redis_reclist_keys = self.redis.scan(str(reclist.id))
-            await self.scan_delete(redis_reclist_keys)
 
-    async def scan_delete(self, redis_keys: List) -> None:
-        for key in redis_keys:
-            await self.redis.delete(key)
\ No newline at end of file
+class RecQueryHandler(QueryHandler):
+
+    async def query_reclist(self, reclist_id: str) -> RecList:
+        reclist = await RecList.query_item(reclist_id, self.public)
+        if not reclist:
+            raise self.not_found()
+        if not self.owns(reclist):
+            raise self.not_found()
+        return reclist
+
+    async def list_projection(self, reclist_id: str) -> type[RecCard]:
+        reclist = await self.query_reclist(reclist_id)
+        return RecCard.for_config(reclist.config)
+
+    async def rec_item(self, reclist_id: str, rec_id: str):
+        # full documents only for detail views, cached alongside the list
+        # pages so invalidating the list drops them too
+        field = f"rec:{rec_id}"
+        await self.authorize_reclist(reclist_id)
+        redis_query = await self.redis_query_field(reclist_id, field)
+        if redis_query:
+            return redis_query
+
+        await self.query_reclist(reclist_id)
+        rec = await Rec.query_item(rec_id, self.public)
+        if not rec or str(rec.reclist.ref.id) != reclist_id:
+            raise self.not_found()
+
+        data = await self.redis.hset_redis(
+                self.redis_key(reclist_id),
+                field,
+                rec,
+                ex=CACHE_EX,
+                tags=self.redis_tags(reclist_id),
+                max_fields=settings.PAGE_CACHE_MAX_FIELDS
+            )
+        return self.cached_response(self.redis.codec.render_tagged(data))
@@ -0,0 +1,223 @@
+import abc
+import asyncio
+import threading
+import time
+from bisect import bisect_left
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.security.config import settings
+
+# seconds, from a cache hit to a slow aggregation
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def format_labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+class Metric(abc.ABC):
+    """A metric family in the Prometheus text format. Label values are
+    passed positionally, in the order of ``labels``."""
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        # pymongo calls command listeners from Motor's worker threads
+        self.lock = threading.Lock()
+
+    @abc.abstractmethod
+    def samples(self) -> list:
+        ...
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines += self.samples()
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        super().__init__(name, help, labels)
+        self.values: dict = {}
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        if not settings.METRICS_ENABLED:
+            return
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self) -> list:
+        return [
+            f"{self.name}{format_labels(self.labels, labels)} {value}"
+            for labels, value in list(self.values.items())
+        ]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = buckets
+        # per label set: [count per bucket (last one +Inf), sum]
+        self.values: dict = {}
+
+    def observe(self, value: float, *labels) -> None:
+        if not settings.METRICS_ENABLED:
+            return
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.values.get(labels)
+            if series is None:
+                series = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def samples(self) -> list:
+        lines = []
+        bounds = [str(bucket) for bucket in self.buckets] + ["+Inf"]
+        names = self.labels + ("le",)
+        for labels, (counts, total) in list(self.values.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{format_labels(names, labels + (bound,))} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.labels, labels)} {total}")
+            lines.append(f"{self.name}_count{format_labels(self.labels, labels)} {cumulative}")
+        return lines
+
+
+class Collected(Metric):
+    """Read from ``collect() -> {label values: value}`` at scrape time, for
+    stats other objects already keep (pools, the near cache)."""
+
+    def __init__(self, name: str, help: str, labels: tuple, collect, kind: str = "gauge"):
+        super().__init__(name, help, labels)
+        self.collect = collect
+        self.kind = kind
+
+    def samples(self) -> list:
+        return [
+            f"{self.name}{format_labels(self.labels, labels)} {value}"
+            for labels, value in self.collect().items()
+        ]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: list[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self.metrics) + "\n"
+
+
+registry = Registry()
+
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds",
+    "Time to handle a request, by route name",
+    ("route", "method", "status")
+))
+mongodb_command_duration = registry.register(Histogram(
+    "mongodb_command_duration_seconds",
+    "MongoDB command round trips, by collection and command",
+    ("collection", "command")
+))
+mongodb_command_failures = registry.register(Counter(
+    "mongodb_command_failures_total",
+    "MongoDB commands that failed, by collection and command",
+    ("collection", "command")
+))
+redis_command_duration = registry.register(Histogram(
+    "redis_command_duration_seconds",
+    "Redis round trips, by command (PIPELINE and MULTI for batches)",
+    ("command",)
+))
+redis_cache_requests = registry.register(Counter(
+    "redis_cache_requests_total",
+    "Cached response lookups that reached Redis, by key family",
+    ("family", "result")
+))
+rate_limit_requests = registry.register(Counter(
+    "rate_limit_requests_total",
+    "Rate limit checks, by policy, where they were decided (local or redis) and the result",
+    ("policy", "source", "result")
+))
+event_loop_lag = registry.register(Histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop woke a sleeping task"
+))
+
+
+class MetricsMiddleware:
+    """Times every HTTP request into http_request_duration, labelled with the
+    name of the route that served it (the names View gives class views)."""
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def timed_send(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            # routing sets scope["route"], anything unmatched shares a label
+            # so random paths can't blow up the series count
+            route = scope.get("route")
+            http_request_duration.observe(
+                time.perf_counter() - start,
+                route.name if route is not None else "unmatched",
+                scope["method"],
+                status
+            )
+
+
+class LoopLagMonitor:
+    """Sleeps ``interval`` over and over and records how late it wakes up,
+    which is how long something held the event loop."""
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        self.task = None
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            event_loop_lag.observe(max(loop.time() - start - self.interval, 0.0))
@@ -0,0 +1,37 @@
+import hashlib
+import hmac
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from beanie import PydanticObjectId
+from bson.errors import InvalidId
+from app.security.config import settings
+
+# signed so only cursors we handed out name a cached page, clients can't
+# mint new page fields out of arbitrary ids
+CURSOR_MAC_BYTES = 8
+
+
+def cursor_mac(binary: bytes) -> bytes:
+    return hmac.new(settings.SECRET_KEY.encode(), binary, hashlib.sha256).digest()[:CURSOR_MAC_BYTES]
+
+
+def encode_cursor(object_id: PydanticObjectId) -> str:
+    binary = object_id.binary
+    return urlsafe_b64encode(binary + cursor_mac(binary)).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> PydanticObjectId:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = urlsafe_b64decode(padded)
+        binary, mac = raw[:-CURSOR_MAC_BYTES], raw[-CURSOR_MAC_BYTES:]
+        if not hmac.compare_digest(mac, cursor_mac(binary)):
+            raise ValueError("invalid cursor")
+        return PydanticObjectId(binary)
+    except (ValueError, TypeError, InvalidId):
+        raise ValueError("invalid cursor")
+
+
+def page_field(limit: int, cursor: str | None) -> str:
+    # each page lives in a field of the list's Redis hash, so deleting the
+    # list key drops every cached page at once
+    return f"{limit}:{cursor or ''}"
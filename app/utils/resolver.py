@@ -0,0 +1,99 @@
+from bson import ObjectId
+from bson.errors import InvalidId
+from app.schemas import RecList, User, UserRef
+from app.db.redis import RedisClient
+from app.db.local_cache import LocalCache
+from app.db.near_cache import near_cache
+from app.security.config import settings
+
+
+class UsernameResolver:
+    """Maps public usernames to ``{"user_id", "is_active"}``.
+
+    Lookups go through an in-process LRU, then Redis, and only then MongoDB.
+    Unknown usernames are cached too (with ``user_id`` None) for a short
+    while, so scrapers probing random names don't reach the database. The
+    LRU follows the near cache's evictions, so dropping a name's Redis key
+    (or its user's tag) on any worker drops it here too.
+    """
+    def __init__(self):
+        self.local = LocalCache(settings.USERNAME_CACHE_SIZE, settings.USERNAME_CACHE_TTL)
+        self.redis = RedisClient()
+        near_cache.follow(self)
+
+    @staticmethod
+    def redis_key(username: str) -> str:
+        return f"public_user_{username}"
+
+    async def resolve(self, username: str) -> dict:
+        entry = self.local.get(username)
+        if entry is not None:
+            return entry
+
+        redis_key = self.redis_key(username)
+        entry = await self.redis.get_redis(redis_key)
+        if entry is None:
+            user = await User.find_by_username(username, projection=UserRef)
+            if user:
+                entry = {"user_id": str(user.id), "is_active": user.is_active}
+                await self.redis.set_redis(
+                    redis_key,
+                    entry,
+                    ex=settings.REDIS_CACHE_TTL,
+                    tags=[f"user_{entry['user_id']}"]
+                )
+            else:
+                entry = {"user_id": None, "is_active": False}
+                await self.redis.set_redis(
+                    redis_key,
+                    entry,
+                    ex=settings.USERNAME_CACHE_NEGATIVE_TTL
+                )
+
+        self.local.set(username, entry)
+        return entry
+
+    async def invalidate(self, *usernames: str) -> None:
+        # published to every worker, this one included
+        keys = [self.redis_key(username) for username in usernames]
+        near_cache.evict(await self.redis.invalidate(keys=keys))
+
+    def evict(self, keys: list) -> None:
+        prefix = self.redis_key("")
+        self.local.delete(*(key.removeprefix(prefix) for key in keys if key.startswith(prefix)))
+
+    def clear(self) -> None:
+        self.local.clear()
+
+
+class ReclistOwnerResolver:
+    """Maps reclist ids to their owner's user id.
+
+    Cached list pages and recs are keyed by reclist id alone and shared by
+    everyone allowed to read them, so views check the owner here before
+    looking at the cache. A reclist's owner never changes, so entries are
+    kept in-process without invalidation; unknown ids aren't cached.
+    """
+    def __init__(self):
+        self.local = LocalCache(settings.RECLIST_OWNER_CACHE_SIZE, settings.RECLIST_OWNER_CACHE_TTL)
+
+    async def resolve(self, reclist_id: str) -> str | None:
+        owner = self.local.get(reclist_id)
+        if owner is not None:
+            return owner
+
+        try:
+            object_id = ObjectId(reclist_id)
+        except (InvalidId, TypeError):
+            return None
+        document = await RecList.get_motor_collection().find_one({"_id": object_id}, {"user": 1})
+        if not document:
+            return None
+
+        owner = str(document["user"].id)
+        self.local.set(reclist_id, owner)
+        return owner
+
+
+username_resolver = UsernameResolver()
+reclist_owners = ReclistOwnerResolver()
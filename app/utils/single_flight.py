@@ -0,0 +1,33 @@
+import asyncio
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time in this worker.
+
+    Callers arriving while a call is in flight await the same task and get
+    its result (or exception) instead of starting their own.
+    """
+    def __init__(self):
+        self.calls: dict[str, asyncio.Task] = {}
+
+    async def run(self, key: str, call):
+        task = self.calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(call())
+            self.calls[key] = task
+            task.add_done_callback(lambda done: self.done(key, done))
+        # shielded so a caller that goes away doesn't cancel it for the rest
+        return await asyncio.shield(task)
+
+    def done(self, key: str, task: asyncio.Task) -> None:
+        if self.calls.get(key) is task:
+            del self.calls[key]
+        if not task.cancelled():
+            # mark it retrieved in case every caller has gone
+            task.exception()
+
+    def __len__(self) -> int:
+        return len(self.calls)
+
+
+single_flight = SingleFlight()
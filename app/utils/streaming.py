@@ -0,0 +1,39 @@
+from collections.abc import AsyncIterable, AsyncIterator
+import orjson
+from app.db.codecs import to_primitive
+
+NDJSON = "application/x-ndjson"
+CHUNK_SIZE = 64 * 1024
+
+
+async def _chunked(parts: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    # batch small documents into larger writes
+    buffer = bytearray()
+    async for part in parts:
+        buffer += part
+        if len(buffer) >= CHUNK_SIZE:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+async def _json_array_parts(documents: AsyncIterable) -> AsyncIterator[bytes]:
+    separator = b"["
+    async for document in documents:
+        yield separator + orjson.dumps(to_primitive(document))
+        separator = b","
+    yield b"]" if separator == b"," else b"[]"
+
+
+async def _ndjson_parts(documents: AsyncIterable) -> AsyncIterator[bytes]:
+    async for document in documents:
+        yield orjson.dumps(to_primitive(document)) + b"\n"
+
+
+def json_array(documents: AsyncIterable) -> AsyncIterator[bytes]:
+    return _chunked(_json_array_parts(documents))
+
+
+def ndjson(documents: AsyncIterable) -> AsyncIterator[bytes]:
+    return _chunked(_ndjson_parts(documents))
@@ -0,0 +1,50 @@
+"""Per-request cost of authenticating with the access token cookie.
+
+Times auth_user on a no-op view for each JWT backend, with the verified
+token cache cold (every request verifies the signature) and warm, over a
+pool of distinct users' tokens.
+
+    python -m benchmarks.auth_overhead --users 200 --requests 20000
+"""
+import argparse
+import asyncio
+import time
+
+from app.security import token
+from app.utils.decorators import auth_user
+from app.utils.handlers import QueryHandler
+
+
+class ProbeView(QueryHandler):
+    key = "probe"
+
+    @auth_user
+    async def get(self, access_token: str | None = None):
+        return self.user_id
+
+
+async def run(users: int, requests: int) -> None:
+    print(f"{'backend':<8}{'cache':>8}{'us/request':>14}")
+    for name in token.JWT_BACKENDS:
+        token.jwt = token.get_jwt_backend(name)
+        cookies = [f"Bearer {token.create_access_token(str(n))}" for n in range(users)]
+        view = ProbeView()
+
+        for cached in (False, True):
+            token.verified_tokens.clear()
+            start = time.perf_counter()
+            for n in range(requests):
+                if not cached:
+                    token.verified_tokens.clear()
+                await view.get(access_token=cookies[n % users])
+            elapsed = time.perf_counter() - start
+            label = "warm" if cached else "cold"
+            print(f"{name:<8}{label:>8}{elapsed / requests * 1e6:>14.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(run(args.users, args.requests))
@@ -0,0 +1,85 @@
+"""Compare cache codecs on realistic Rec lists.
+
+Encodes and decodes lists of Rec documents with every registered codec and
+reports time per round-trip, the cost of rendering a cache hit as a JSON
+body, and the stored size.
+
+    python -m benchmarks.cache_codecs --recs 200 --rounds 50
+"""
+import argparse
+import random
+import string
+import time
+
+from beanie import Link, PydanticObjectId
+from bson import DBRef
+
+from app.db.codecs import CODECS, VersionedCodec
+from app.schemas import Rec, RecList, User
+
+RATINGS = ["General Audiences", "Teen And Up Audiences", "Mature", "Explicit"]
+WARNINGS = ["No Archive Warnings Apply", "Creator Chose Not To Use Archive Warnings"]
+FANDOMS = ["Good Omens", "Our Flag Means Death", "Star Wars", "Haikyuu!!", "Hannibal"]
+
+
+def words(n: int) -> str:
+    return " ".join(
+        "".join(random.choices(string.ascii_lowercase, k=random.randint(3, 9)))
+        for _ in range(n)
+    )
+
+
+def make_recs(count: int) -> list:
+    user = Link(DBRef("users", PydanticObjectId()), User)
+    reclist = Link(DBRef("reclists", PydanticObjectId()), RecList)
+    return [
+        Rec.model_construct(
+            id=PydanticObjectId(),
+            user=user,
+            reclist=reclist,
+            title=words(4),
+            author=words(1),
+            summary=words(120),
+            notes=words(30),
+            words=random.randint(1000, 200000),
+            warnings=random.choice(WARNINGS),
+            rating=random.choice(RATINGS),
+            fandom=random.sample(FANDOMS, 2),
+            ship=[words(3) for _ in range(3)],
+            tags=[words(2) for _ in range(15)],
+            language="English",
+            chapters="12/?",
+            url=f"https://archiveofourown.org/works/{random.randint(1, 10**8)}",
+            created="01-01-2025",
+            deleted=False,
+        )
+        for _ in range(count)
+    ]
+
+
+def timed(func, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def run(recs: int, rounds: int) -> None:
+    value = make_recs(recs)
+    print(f"{recs} recs, {rounds} rounds, ms per op")
+    print(f"{'codec':<10}{'encode':>10}{'decode':>10}{'render':>10}{'bytes':>12}")
+    for name, codec in CODECS.items():
+        versioned = VersionedCodec(codec, 1)
+        data = versioned.encode(value)
+        encode = timed(lambda: versioned.encode(value), rounds)
+        decode = timed(lambda: versioned.decode(data), rounds)
+        render = timed(lambda: versioned.render(data), rounds)
+        print(f"{name:<10}{encode:>10.2f}{decode:>10.2f}{render:>10.2f}{len(data):>12}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recs", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+    run(args.recs, args.rounds)
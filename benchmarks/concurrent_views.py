@@ -0,0 +1,75 @@
+"""Concurrency stress check for class-based views.
+
+Fires many overlapping requests for different users at one worker and
+verifies every request built its cache key from its own user id.
+
+    python -m benchmarks.concurrent_views --users 50 --requests 5000
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from fastapi import APIRouter, Cookie, FastAPI
+
+from app.security.token import create_access_token
+from app.utils.decorators import auth_user
+from app.utils.fastapi_class_view import View
+from app.utils.handlers import QueryHandler
+
+router = APIRouter()
+
+
+@View(router, path="/probe")
+class ProbeView(QueryHandler):
+    key = "probe"
+
+    @auth_user
+    async def get(self, access_token: str | None = Cookie(default=None)):
+        # yield to the loop so other requests get to run in between
+        await asyncio.sleep(0)
+        return {"user_id": self.user_id, "key": self.redis_key(self.user_id)}
+
+
+async def run(users: int, requests: int, concurrency: int) -> None:
+    app = FastAPI()
+    app.include_router(router)
+
+    tokens = {str(n): create_access_token(str(n)) for n in range(users)}
+    semaphore = asyncio.Semaphore(concurrency)
+    crossed = 0
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(n: int) -> None:
+            nonlocal crossed
+            user_id = str(n % users)
+            async with semaphore:
+                response = await client.get(
+                    "/probe",
+                    cookies={"access_token": f"Bearer {tokens[user_id]}"}
+                )
+            body = response.json()
+            if body["user_id"] != user_id or body["key"] != f"auth_probe_{user_id}":
+                crossed += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(n) for n in range(requests)))
+        elapsed = time.perf_counter() - start
+
+    print(f"requests:      {requests}")
+    print(f"users:         {users}")
+    print(f"concurrency:   {concurrency}")
+    print(f"throughput:    {requests / elapsed:.0f} req/s")
+    print(f"crossed keys:  {crossed}")
+    if crossed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args.users, args.requests, args.concurrency))
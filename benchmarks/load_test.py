@@ -0,0 +1,248 @@
+"""Load test: boot the app on local stand-ins, seed it, drive scenarios.
+
+Starts the real app (lifespan included) in process against mongomock-motor
+and fakeredis, or a local mongod / redis-server when their URLs are given
+(see benchmarks.stand_ins), seeds synthetic users, collections and recs,
+then runs a weighted mix of scenarios and reports throughput and
+p50/p95/p99 per route:
+
+- browse: anonymous visits to a profile, its overview, collections, rec
+  pages and a faceted search
+- login: a password login, bcrypt on the password pool
+- edit: an owner renaming a collection, adding, importing and deleting
+  recs, then reading their own list back
+
+Exits 1 on any 5xx, or if a route's p99 is over --fail-p99-ms.
+
+    python -m benchmarks.load_test --users 200 --sessions 2000 --concurrency 50
+    python -m benchmarks.load_test --mix browse=1 --mongo-uri mongodb://localhost:27017 --redis-url redis://localhost:6379/0
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from collections import Counter, defaultdict
+
+import httpx
+import orjson
+from beanie import Link, PydanticObjectId
+from bson import DBRef
+
+from benchmarks import stand_ins
+from app.main import app
+from app.schemas import PasswordForm, Rec, RecList, User
+from app.security.config import settings
+from app.security.token import create_access_token
+from benchmarks.cache_codecs import FANDOMS, RATINGS, WARNINGS, words
+
+PASSWORD = "benchmark"
+
+
+def rec_payload() -> dict:
+    return {
+        "title": words(4),
+        "author": words(1),
+        "summary": words(60),
+        "words": random.randint(1000, 200000),
+        "warnings": random.choice(WARNINGS),
+        "rating": random.choice(RATINGS),
+        "fandom": random.sample(FANDOMS, 2),
+        "ship": [words(2)],
+        "tags": [words(2) for _ in range(5)],
+        "language": "English",
+        "chapters": "1/1",
+        "url": f"https://archiveofourown.org/works/{random.randint(1, 10**8)}",
+    }
+
+
+async def seed(users: int, collections: int, recs: int) -> list:
+    # one bcrypt hash for everyone, hashing per user would dominate seeding
+    hashed = await PasswordForm.hash_password(PASSWORD)
+    people = []
+    for n in range(users):
+        user = User(id=PydanticObjectId(), username=f"reader{n:05d}", password=hashed)
+        owner = Link(DBRef(User.Settings.name, user.id), User)
+        reclists = [
+            RecList(id=PydanticObjectId(), user=owner, name=words(3), private=(c % 4 == 3))
+            for c in range(collections)
+        ]
+        documents = [
+            Rec(**rec_payload(), user=owner, reclist=Link(DBRef(RecList.Settings.name, reclist.id), RecList))
+            for reclist in reclists
+            for _ in range(recs)
+        ]
+        await User.insert_one(user)
+        await RecList.insert_many(reclists)
+        if documents:
+            await Rec.insert_many(documents)
+        people.append({
+            "username": user.username,
+            "user_id": str(user.id),
+            "cookie": f"access_token=Bearer {create_access_token(str(user.id))}",
+            "public": [str(reclist.id) for reclist in reclists if not reclist.private],
+            "all": [str(reclist.id) for reclist in reclists],
+        })
+    return people
+
+
+class Recorder:
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+        self.timings: dict = defaultdict(list)
+        self.errors: Counter = Counter()
+
+    async def request(self, route: str, method: str, url: str, **kwargs) -> httpx.Response:
+        start = time.perf_counter()
+        response = await self.client.request(method, url, **kwargs)
+        self.timings[route].append(time.perf_counter() - start)
+        if response.status_code >= 500:
+            self.errors[route] += 1
+        return response
+
+
+async def browse(recorder: Recorder, people: list, user: dict) -> None:
+    name = user["username"]
+    await recorder.request("GET /{username}", "GET", f"/v1/{name}")
+    await recorder.request("GET /{username}/overview", "GET", f"/v1/{name}/overview")
+    await recorder.request("GET /{username}/collections", "GET", f"/v1/{name}/collections")
+    if user["public"]:
+        url = f"/v1/{name}/collections/{random.choice(user['public'])}"
+        page = await recorder.request("GET /{username}/collections/{id}", "GET", url, params={"limit": 20})
+        cursor = page.json().get("next_cursor") if page.status_code == 200 else None
+        if cursor:
+            await recorder.request(
+                "GET /{username}/collections/{id} next page", "GET", url,
+                params={"limit": 20, "cursor": cursor}
+            )
+    await recorder.request(
+        "GET /{username}/search", "GET", f"/v1/{name}/search",
+        params={"fandom": random.choice(FANDOMS), "limit": 20}
+    )
+
+
+async def login(recorder: Recorder, people: list, user: dict) -> None:
+    await recorder.request(
+        "POST /auth/login", "POST", "/v1/auth/login",
+        data={"username": user["username"], "password": PASSWORD}
+    )
+
+
+async def edit(recorder: Recorder, people: list, user: dict) -> None:
+    headers = {"cookie": user["cookie"]}
+    reclist_id = random.choice(user["all"])
+    base = f"/v1/profile/collections/{reclist_id}"
+
+    await recorder.request("PUT /profile/collections/{id}", "PUT", base, json={"name": words(3)}, headers=headers)
+    created = await recorder.request(
+        "POST /profile/collections/{id}/recs", "POST", f"{base}/recs",
+        json=rec_payload(),
+        headers=headers
+    )
+    await recorder.request(
+        "POST /profile/collections/{id}/recs/import", "POST", f"{base}/recs/import",
+        content=b"\n".join(orjson.dumps(rec_payload()) for _ in range(20)),
+        headers={**headers, "content-type": "application/x-ndjson"}
+    )
+    if created.status_code == 200:
+        await recorder.request(
+            "DELETE /profile/collections/{id}/recs", "DELETE", f"{base}/recs",
+            params={"rec_id": created.json()["created"]["_id"]},
+            headers=headers
+        )
+    await recorder.request(
+        "GET /profile/collections/{id}/recs", "GET", f"{base}/recs",
+        params={"limit": 20}, headers=headers
+    )
+
+
+SCENARIOS = {"browse": browse, "login": login, "edit": edit}
+
+
+def parse_mix(mix: str) -> dict:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise SystemExit(f"unknown scenario {name!r}, pick from {', '.join(SCENARIOS)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def report(recorder: Recorder, elapsed: float) -> float:
+    print(f"{'route':<46}{'count':>7}{'req/s':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'5xx':>6}")
+    worst = 0.0
+    for route, timings in sorted(recorder.timings.items()):
+        values = sorted(timings)
+        p50, p95, p99 = (percentile(values, q) * 1000 for q in (0.5, 0.95, 0.99))
+        worst = max(worst, p99)
+        print(
+            f"{route:<46}{len(values):>7}{len(values) / elapsed:>8.0f}"
+            f"{p50:>7.1f}ms{p95:>7.1f}ms{p99:>7.1f}ms{recorder.errors[route]:>6}"
+        )
+    total = sum(len(timings) for timings in recorder.timings.values())
+    everything = sorted(t for timings in recorder.timings.values() for t in timings)
+    print(
+        f"\n{total} requests in {elapsed:.1f}s, {total / elapsed:.0f} req/s, "
+        f"mean {statistics.fmean(everything) * 1000:.1f}ms"
+    )
+    return worst
+
+
+async def run(args) -> None:
+    stand_ins.use_mongo(args.mongo_uri)
+    stand_ins.use_redis(args.redis_url)
+    # every session comes from one client address, and login is limited
+    # to a handful a minute
+    settings.RATE_LIMIT_ENABLED = False
+    weights = parse_mix(args.mix)
+    random.seed(args.seed)
+
+    async with app.router.lifespan_context(app):
+        start = time.perf_counter()
+        people = await seed(args.users, args.collections, args.recs)
+        print(
+            f"seeded {args.users} users, {args.users * args.collections} collections, "
+            f"{args.users * args.collections * args.recs} recs in {time.perf_counter() - start:.1f}s\n"
+        )
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="https://bench") as client:
+            recorder = Recorder(client)
+            semaphore = asyncio.Semaphore(args.concurrency)
+            names = list(weights)
+            picks = random.choices(names, weights=[weights[name] for name in names], k=args.sessions)
+
+            async def session(name: str) -> None:
+                async with semaphore:
+                    await SCENARIOS[name](recorder, people, random.choice(people))
+
+            start = time.perf_counter()
+            await asyncio.gather(*(session(name) for name in picks))
+            elapsed = time.perf_counter() - start
+
+    worst = report(recorder, elapsed)
+    if sum(recorder.errors.values()):
+        raise SystemExit(1)
+    if args.fail_p99_ms and worst > args.fail_p99_ms:
+        print(f"p99 {worst:.1f}ms is over --fail-p99-ms {args.fail_p99_ms}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--collections", type=int, default=4, help="per user, every fourth is private")
+    parser.add_argument("--recs", type=int, default=20, help="per collection")
+    parser.add_argument("--sessions", type=int, default=500, help="scenario runs")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--mix", default="browse=80,login=5,edit=15", help="scenario weights")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--fail-p99-ms", type=float, default=None)
+    parser.add_argument("--mongo-uri", default=None, help="a real mongod instead of mongomock-motor")
+    parser.add_argument("--redis-url", default=None, help="a real Redis instead of fakeredis")
+    asyncio.run(run(parser.parse_args()))
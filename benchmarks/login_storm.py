@@ -0,0 +1,92 @@
+"""Latency of unrelated GETs while logins hammer bcrypt.
+
+Runs a storm of password verifications next to a steady stream of cheap
+GETs on one event loop, once with bcrypt called inline (the old
+behaviour) and once through the password_hasher pool, and reports GET
+latency percentiles for both.
+
+    python -m benchmarks.login_storm --logins 50 --gets 500
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from app.security.crypt_context import PW_CONTEXT, password_hasher
+
+HASHED = PW_CONTEXT.hash("correct horse")
+
+
+def build_app(offload: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/login")
+    async def login():
+        if offload:
+            ok = await password_hasher.verify("correct horse", HASHED)
+        else:
+            ok = PW_CONTEXT.verify("correct horse", HASHED)
+        return {"ok": ok}
+
+    @app.get("/ping")
+    async def ping():
+        return {"pong": True}
+
+    return app
+
+
+def percentile(samples: list, pct: float) -> float:
+    return statistics.quantiles(samples, n=100)[int(pct) - 1] * 1000
+
+
+async def run(offload: bool, logins: int, gets: int, concurrency: int, interval: float) -> dict:
+    transport = httpx.ASGITransport(app=build_app(offload))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+
+        async def login():
+            async with semaphore:
+                await client.post("/login")
+
+        async def get(scheduled: float):
+            # measured from when the GET was due, so time spent waiting for
+            # a blocked loop counts against it
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+            await client.get("/ping")
+            latencies.append(time.perf_counter() - scheduled)
+
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(get(start + n * interval) for n in range(gets)),
+            *(login() for _ in range(logins))
+        )
+        elapsed = time.perf_counter() - start
+
+    return {
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "elapsed": elapsed,
+    }
+
+
+async def main(logins: int, gets: int, concurrency: int, interval: float) -> None:
+    print(f"{logins} logins, {gets} GETs, GET latency in ms")
+    print(f"{'mode':<10}{'p50':>10}{'p99':>10}{'total s':>10}")
+    for mode, offload in (("inline", False), ("pool", True)):
+        result = await run(offload, logins, gets, concurrency, interval)
+        print(f"{mode:<10}{result['p50']:>10.2f}{result['p99']:>10.2f}{result['elapsed']:>10.2f}")
+    print(password_hasher.metrics())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--gets", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--interval", type=float, default=0.01, help="seconds between GETs")
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.gets, args.concurrency, args.interval))
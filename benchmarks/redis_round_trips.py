@@ -0,0 +1,199 @@
+"""Redis round trips per mutation, per-key deletes vs the handlers' cache updates.
+
+Replays the cache work done by the collection, rec and username mutations,
+once with the old one-key-at-a-time SET "" + DEL helpers and once through
+the views' own cache update methods (tag invalidation and WATCH/MULTI
+write-through patches), counting round trips and timing them, on a warm
+cache holding the documents being changed. Without --url it runs on
+fakeredis and adds --rtt-ms of latency to every round trip to stand in
+for the network.
+
+    python -m benchmarks.redis_round_trips --rounds 200 --rtt-ms 0.5
+    python -m benchmarks.redis_round_trips --url redis://localhost:6379/0
+"""
+import argparse
+import asyncio
+import time
+
+from beanie import PydanticObjectId
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+
+from app.api.v1.profile.collection import UserCollectionsView
+from app.api.v1.profile.collection_detail import UserCollectionItemView
+from app.api.v1.profile.rec import UserRecsView
+from app.api.v1.profile.user import UserProfileView
+from app.db.redis import redis_pool
+from app.utils.resolver import username_resolver
+
+round_trips = 0
+rtt = 0.0
+
+
+def count_round_trips() -> None:
+    execute_command = Redis.execute_command
+    execute = Pipeline.execute
+
+    async def counted_command(self, *args, **options):
+        global round_trips
+        if isinstance(self, Pipeline):
+            # buffered, sent by execute()
+            return await execute_command(self, *args, **options)
+        round_trips += 1
+        if rtt:
+            await asyncio.sleep(rtt)
+        return await execute_command(self, *args, **options)
+
+    async def counted_execute(self, *args, **options):
+        global round_trips
+        round_trips += 1
+        if rtt:
+            await asyncio.sleep(rtt)
+        return await execute(self, *args, **options)
+
+    Redis.execute_command = counted_command
+    Pipeline.execute = counted_execute
+
+
+def view(registered, base: str, user_id: str):
+    # @View leaves the module name bound to an instance, make a fresh one
+    instance = type(registered)()
+    instance.base = base
+    instance.user_id = user_id
+    return instance
+
+
+async def fill(user_id: str, reclist_id: str, rec_id: str, username: str) -> None:
+    # what a warm cache holds for one user with one open collection
+    reclist = {"_id": reclist_id, "name": "faves", "private": False}
+    rec = {"_id": rec_id, "title": "a rec"}
+    for base in ("auth", "public"):
+        collections = view(UserCollectionsView, base, user_id)
+        await collections.redis.hset_redis(
+            collections.redis_key(user_id),
+            "50:",
+            {"items": [reclist], "next_cursor": None},
+            tags=collections.redis_tags(user_id)
+        )
+        detail = view(UserCollectionItemView, base, user_id)
+        await detail.redis.set_redis(detail.redis_key(reclist_id), reclist, tags=detail.redis_tags(reclist_id))
+        recs = view(UserRecsView, base, user_id)
+        await recs.redis.hset_redis(
+            recs.redis_key(reclist_id),
+            "50:",
+            {"items": [rec], "next_cursor": None},
+            tags=recs.redis_tags(reclist_id)
+        )
+        await recs.redis.hset_redis(recs.redis_key(reclist_id), f"rec:{rec_id}", rec, tags=recs.redis_tags(reclist_id))
+    await username_resolver.redis.set_redis(
+        username_resolver.redis_key(username),
+        {"user_id": user_id, "is_active": True},
+        tags=[f"user_{user_id}"]
+    )
+
+
+async def legacy_delete(keys: list) -> None:
+    for key in keys:
+        await redis_pool.client.set(key, "")
+        await redis_pool.client.delete(key)
+
+
+def legacy_keys(key: str, query_id: str) -> list:
+    return [f"auth_{key}_{query_id}", f"public_{key}_{query_id}"]
+
+
+async def collection_rename_before(user_id: str, reclist_id: str, rec_id: str, username: str) -> None:
+    await legacy_delete(legacy_keys("collections_detail", reclist_id))
+    await legacy_delete(legacy_keys("collections", user_id))
+
+
+async def collection_rename_after(user_id: str, reclist_id: str, rec_id: str, username: str) -> None:
+    handler = view(UserCollectionItemView, "auth", user_id)
+    item = {"_id": reclist_id, "name": "renamed", "private": False}
+    await handler.patch_cached(reclist_id, item, tags=[handler.profile_page_tag()])
+
+
+async def collection_delete_before(user_id: str, reclist_id: str, rec_id: str, username: str) -> None:
+    await legacy_delete(legacy_keys("collections_detail", reclist_id))
+    await legacy_delete(legacy_keys("collections", user_id))
+    await legacy_delete(legacy_keys("collections_detail_recs", reclist_id))
+
+
+async def collection_delete_after(user_id: str, reclist_id: str, rec_id: str, username: str) -> None:
+    await view(UserCollectionItemView, "auth", user_id).drop_cached(reclist_id)
+
+
+async def rec_delete_before(user_id: str, reclist_id: str, rec_id: str, username: str) -> None:
+    await legacy_delete(legacy_keys("collections_detail_recs", reclist_id))
+    await legacy_delete(legacy_keys("collections_detail", reclist_id))
+
+
+async def rec_delete_after(user_id: str, reclist_id: str, rec_id: str, username: str) -> None:
+    await view(UserRecsView, "auth", user_id).drop_cached_rec(reclist_id, rec_id)
+
+
+async def rename_before(user_id: str, reclist_id: str, rec_id: str, username: str) -> None:
+    await legacy_delete(legacy_keys("profile", user_id))
+    await legacy_delete([f"public_user_{username}", f"public_user_{username}2"])
+
+
+async def rename_after(user_id: str, reclist_id: str, rec_id: str, username: str) -> None:
+    await view(UserProfileView, "auth", user_id).delete_redis_item(user_id)
+    await username_resolver.invalidate(username, f"{username}2")
+
+
+SCENARIOS = {
+    "collection rename": (collection_rename_before, collection_rename_after),
+    "collection delete": (collection_delete_before, collection_delete_after),
+    "rec delete": (rec_delete_before, rec_delete_after),
+    "username change": (rename_before, rename_after),
+}
+
+
+async def measure(mutation, rounds: int) -> tuple[float, float]:
+    global round_trips
+    trips = 0
+    elapsed = 0.0
+    for n in range(rounds):
+        user_id, reclist_id, rec_id = (str(PydanticObjectId()) for _ in range(3))
+        username = f"user{n}"
+        await fill(user_id, reclist_id, rec_id, username)
+        round_trips = 0
+        start = time.perf_counter()
+        await mutation(user_id, reclist_id, rec_id, username)
+        elapsed += time.perf_counter() - start
+        trips += round_trips
+    return trips / rounds, elapsed / rounds * 1000
+
+
+async def run(rounds: int, url: str | None) -> None:
+    if url:
+        redis_pool.client = Redis.from_url(url)
+    else:
+        from fakeredis.aioredis import FakeRedis
+        redis_pool.client = FakeRedis()
+    count_round_trips()
+
+    # load the invalidation script so it isn't counted against the first run
+    await collection_delete_after(*(str(PydanticObjectId()) for _ in range(3)), "warmup")
+
+    print(f"{'mutation':<34}{'before':>16}{'after':>16}")
+    for name, (before, after) in SCENARIOS.items():
+        trips_before, ms_before = await measure(before, rounds)
+        trips_after, ms_after = await measure(after, rounds)
+        print(
+            f"{name:<34}"
+            f"{trips_before:>5.0f} rt {ms_before:>6.2f} ms"
+            f"{trips_after:>5.0f} rt {ms_after:>6.2f} ms"
+        )
+    await redis_pool.client.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--rtt-ms", type=float, default=0.5, help="simulated latency, fakeredis only")
+    parser.add_argument("--url", default=None, help="run against a real Redis instead of fakeredis")
+    args = parser.parse_args()
+    rtt = 0.0 if args.url else args.rtt_ms / 1000
+    asyncio.run(run(args.rounds, args.url))
@@ -0,0 +1,116 @@
+"""Rec validation cost, per-field nh3 validators vs the one-pass sanitizer.
+
+Validates a corpus of rec payloads shaped like an AO3 import (fandoms and
+ships drawn from small pools, a share of summaries with markup) through
+two copies of Rec's fields, one with the old per-field ``nh3.clean``
+validators and one with the Sanitized base Rec uses now, and checks both
+produce the same documents. Copies, so it runs without a database.
+
+    python -m benchmarks.sanitize --recs 2000 --rounds 5
+"""
+import argparse
+import random
+import time
+
+import nh3
+from pydantic import create_model, field_validator
+
+from app.schemas import Rec
+from app.schemas.sanitize import Sanitized, clean_tag
+from benchmarks.cache_codecs import FANDOMS, RATINGS, WARNINGS, words
+
+SHIPS = [f"{a}/{b}" for a in ("Aziraphale", "Crowley", "Ed", "Stede", "Hinata", "Kageyama") for b in ("Crowley", "Stede", "Kageyama", "Oikawa")]
+TAGS = ["Fluff", "Angst", "Hurt/Comfort", "Slow Burn", "Found Family", "Canon Divergence", "Enemies to Lovers", "Alternate Universe - Coffee Shops & Cafés"]
+
+
+def clean_text(cls, value):
+    return nh3.clean(value) if value else value
+
+
+def clean_list(cls, value):
+    return [nh3.clean(tag) for tag in value]
+
+
+def rec_fields() -> dict:
+    # Links need an initialised database to validate, and aren't sanitized
+    return {
+        name: (field.annotation, field)
+        for name, field in Rec.model_fields.items()
+        if name not in ("user", "reclist", "revision_id", "id")
+    }
+
+
+def legacy_rec() -> type:
+    # the validators Rec had before the sanitizer
+    validators = {
+        f"clean_{name}": field_validator(name)(classmethod(clean_text))
+        for name in ("title", "summary", "notes", "warnings", "rating", "language", "chapters")
+    }
+    validators.update({
+        f"clean_{name}": field_validator(name)(classmethod(clean_list))
+        for name in ("fandom", "ship", "tags")
+    })
+    return create_model("LegacyRec", __validators__=validators, **rec_fields())
+
+
+def current_rec() -> type:
+    return create_model("CurrentRec", __base__=Sanitized, **rec_fields())
+
+
+def summary() -> str:
+    text = words(120)
+    if random.random() < 0.2:
+        return f"<p>{text}</p><p><em>{words(10)}</em></p>"
+    return text
+
+
+def make_payloads(count: int) -> list:
+    return [
+        {
+            "title": words(4),
+            "author": words(1),
+            "summary": summary(),
+            "notes": words(30),
+            "words": random.randint(1000, 200000),
+            "warnings": random.choice(WARNINGS),
+            "rating": random.choice(RATINGS),
+            "fandom": random.sample(FANDOMS, 2),
+            "ship": random.sample(SHIPS, 3),
+            "tags": random.sample(TAGS, 5),
+            "language": "English",
+            "chapters": "12/?",
+            "url": f"https://archiveofourown.org/works/{random.randint(1, 10**8)}",
+        }
+        for _ in range(count)
+    ]
+
+
+def timed(model, payloads: list, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for payload in payloads:
+            model(**payload)
+    return (time.perf_counter() - start) / rounds / len(payloads) * 1_000_000
+
+
+def run(recs: int, rounds: int) -> None:
+    payloads = make_payloads(recs)
+    legacy, current = legacy_rec(), current_rec()
+
+    for payload in payloads:
+        assert legacy(**payload).model_dump() == current(**payload).model_dump()
+
+    before = timed(legacy, payloads, rounds)
+    after = timed(current, payloads, rounds)
+    print(f"{recs} recs, {rounds} rounds, µs per rec")
+    print(f"{'per-field validators':<24}{before:>10.1f}")
+    print(f"{'one-pass sanitizer':<24}{after:>10.1f}")
+    print(f"tag cache {clean_tag.cache_info()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recs", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    run(args.recs, args.rounds)
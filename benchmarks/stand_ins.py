@@ -0,0 +1,77 @@
+"""Local stand-ins for MongoDB and Redis, for benchmarks that boot the app.
+
+Without a URL, MongoDB is mongomock-motor and Redis is fakeredis, both
+dev-only installs (``pip install mongomock-motor fakeredis lupa``, lupa
+runs the Lua scripts). Gaps in mongomock the app depends on are patched:
+
+- DBRef fields: queries on ``user.$id`` / ``reclist.$id`` don't match a
+  DBRef in mongomock, so DBRefs are matched as ``{"$ref", "$id"}``
+- ``$lookup`` with ``localField`` and a ``pipeline`` (the profile overview)
+
+Still missing: ``$text`` (search with ``q``) and ``$indexStats`` (logged
+at startup and skipped). mongomock runs queries in Python without
+indexes, so compare stand-in runs with stand-in runs, not with a real
+deployment.
+"""
+import tempfile
+
+from app.db import mongodb
+from app.db.redis import redis_pool
+from app.security.config import settings
+
+
+def patch_mongomock() -> None:
+    import mongomock.aggregate
+    import mongomock.filtering
+    from bson import DBRef
+
+    iter_key_candidates = mongomock.filtering.iter_key_candidates
+
+    def dbref_key_candidates(key, doc):
+        if isinstance(doc, DBRef):
+            doc = {"$ref": doc.collection, "$id": doc.id}
+        return iter_key_candidates(key, doc)
+
+    lookup = mongomock.aggregate._handle_lookup_stage
+
+    def lookup_pipeline(in_collection, database, options):
+        if "pipeline" not in options:
+            return lookup(in_collection, database, options)
+        foreign = database.get_collection(options["from"])
+        for doc in in_collection:
+            matches = list(foreign.find({options["foreignField"]: doc.get(options["localField"])}))
+            doc[options["as"]] = list(
+                mongomock.aggregate.process_pipeline(matches, database, options["pipeline"], None)
+            )
+        return in_collection
+
+    mongomock.filtering.iter_key_candidates = dbref_key_candidates
+    mongomock.aggregate._PIPELINE_HANDLERS["$lookup"] = lookup_pipeline
+
+
+def use_mongo(uri: str | None) -> None:
+    if uri:
+        settings.MONGO_URI = uri
+        return
+    from mongomock_motor import AsyncMongoMockClient
+
+    patch_mongomock()
+    mongodb.AsyncIOMotorClient = lambda *args, **kwargs: AsyncMongoMockClient()
+    # GridFS isn't in mongomock either
+    settings.AVATAR_STORAGE = "disk"
+    settings.AVATAR_DIR = tempfile.mkdtemp(prefix="avatars")
+
+
+def use_redis(url: str | None) -> None:
+    from redis.asyncio import Redis
+
+    if url:
+        client = Redis.from_url(url)
+    else:
+        from fakeredis.aioredis import FakeRedis
+        client = FakeRedis()
+
+    async def open() -> None:
+        redis_pool.client = client
+
+    redis_pool.open = open
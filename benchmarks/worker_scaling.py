@@ -0,0 +1,178 @@
+"""Throughput by worker count, through the production entry point.
+
+For each worker count, starts ``app.server``'s uvicorn setup (uvloop,
+httptools, the configured keep-alive and backlog) as a separate process,
+drives it over real sockets from --clients load generator processes for
+--duration seconds, then stops it with SIGTERM so each run also goes
+through the graceful drain. Public profile, collections and overview
+requests for seeded users, mostly cache hits, so the numbers are about
+the per-worker request path rather than the database.
+
+By default every worker boots on its own mongomock-motor and fakeredis
+(benchmarks.stand_ins) and seeds the same users; pass --mongo-uri and
+--redis-url to share a local mongod and redis-server instead. Scaling
+stops at the machine's CPU count, and the load generators share it too.
+
+    python -m benchmarks.worker_scaling --workers 1,2,4 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+
+import httpx
+
+from benchmarks.load_test import percentile
+
+USERS = int(os.environ.get("BENCH_USERS", 50))
+
+
+def usernames() -> list:
+    return [f"reader{n:05d}" for n in range(USERS)]
+
+
+def serving_app():
+    # what each worker imports, the app on stand-ins seeded at startup
+    from benchmarks import stand_ins
+    from benchmarks.load_test import seed
+    from app.main import app
+    from app.schemas import User
+
+    stand_ins.use_mongo(os.environ.get("BENCH_MONGO_URI"))
+    stand_ins.use_redis(os.environ.get("BENCH_REDIS_URL"))
+    lifespan = app.router.lifespan_context
+
+    @asynccontextmanager
+    async def seeded(app):
+        async with lifespan(app) as state:
+            if not await User.find_by_username(usernames()[0]):
+                random.seed(1)
+                try:
+                    await seed(USERS, 3, 20)
+                except Exception:
+                    # another worker seeded the shared database first
+                    pass
+            yield state
+
+    app.router.lifespan_context = seeded
+    return app
+
+
+if os.environ.get("BENCH_SERVING"):
+    app = serving_app()
+
+
+def generate(port: int, duration: float, concurrency: int) -> tuple[list, int]:
+    async def run() -> tuple[list, int]:
+        timings, errors = [], 0
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits) as client:
+            deadline = time.perf_counter() + duration
+
+            async def loop() -> None:
+                nonlocal errors
+                names = usernames()
+                while time.perf_counter() < deadline:
+                    name = random.choice(names)
+                    path = random.choice((f"/v1/{name}", f"/v1/{name}/collections", f"/v1/{name}/overview"))
+                    start = time.perf_counter()
+                    try:
+                        response = await client.get(path)
+                        if response.status_code != 200:
+                            errors += 1
+                    except httpx.HTTPError:
+                        errors += 1
+                    timings.append(time.perf_counter() - start)
+
+            await asyncio.gather(*(loop() for _ in range(concurrency)))
+        return timings, errors
+
+    return asyncio.run(run())
+
+
+def wait_ready(port: int, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/v1/{usernames()[0]}").status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise SystemExit("server didn't come up")
+
+
+def serve(workers: int, port: int) -> None:
+    import uvicorn
+    from app.server import server_options
+
+    uvicorn.run(
+        "benchmarks.worker_scaling:app",
+        **server_options(workers=workers, host="127.0.0.1", port=port, access_log=False)
+    )
+
+
+def measure(workers: int, args) -> None:
+    # the load generators all share one client address
+    env = {**os.environ, "BENCH_SERVING": "1", "RATE_LIMIT_ENABLED": "false"}
+    if args.mongo_uri:
+        env["BENCH_MONGO_URI"] = args.mongo_uri
+    if args.redis_url:
+        env["BENCH_REDIS_URL"] = args.redis_url
+    server = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.worker_scaling", "--serve", str(workers), "--port", str(args.port)],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_ready(args.port)
+        # every worker seeds on startup, give the last ones time to finish
+        time.sleep(2)
+        with ProcessPoolExecutor(args.clients) as pool:
+            runs = list(pool.map(
+                generate,
+                [args.port] * args.clients,
+                [args.duration] * args.clients,
+                [args.concurrency] * args.clients
+            ))
+    finally:
+        server.send_signal(signal.SIGTERM)
+        drain_start = time.perf_counter()
+        server.wait(timeout=60)
+        drained = time.perf_counter() - drain_start
+
+    timings = sorted(t for run_timings, _ in runs for t in run_timings)
+    errors = sum(run_errors for _, run_errors in runs)
+    p50, p99 = (percentile(timings, q) * 1000 for q in (0.5, 0.99))
+    print(
+        f"{workers:>7}{len(timings) / args.duration:>10.0f}"
+        f"{p50:>8.1f}ms{p99:>8.1f}ms{errors:>8}{drained:>9.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", default="1,2,4", help="worker counts to compare")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--clients", type=int, default=2, help="load generator processes")
+    parser.add_argument("--concurrency", type=int, default=32, help="connections per load generator")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--mongo-uri", default=None)
+    parser.add_argument("--redis-url", default=None)
+    parser.add_argument("--serve", type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port)
+    else:
+        print(f"{os.cpu_count()} CPUs, {args.clients} x {args.concurrency} connections, {args.duration:.0f}s each")
+        print(f"{'workers':>7}{'req/s':>10}{'p50':>10}{'p99':>10}{'errors':>8}{'drain':>10}")
+        for workers in (int(n) for n in args.workers.split(",")):
+            measure(workers, args)